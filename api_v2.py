@@ -0,0 +1,150 @@
+import json
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, url_for
+from flask_login import current_user
+from models import db, User, Story, Comment, StoryLike, CommentLike, UserTimeline
+from ranking import popular_sort_column
+from pagination import keyset_condition, next_cursor, InvalidCursor
+from images import variant_url
+from feed import card_select
+from database import read_only
+
+try:
+    import orjson
+except ImportError:  # opsional: tanpa orjson memakai json bawaan (lebih lambat)
+    orjson = None
+
+# API baca versi 2, dipakai infinite scroll (script.js) dan klien lain. Berbeda
+# dengan /api/stories: query Core yang SELECT kolom kartu + nama author lewat
+# JOIN (feed.py, tanpa objek ORM, identity map, maupun lazy load), cursor
+# keyset, dan JSON diserialisasi orjson. Tanggal dikirim ISO 8601.
+
+api = Blueprint('api_v2', __name__, url_prefix='/api/v2')
+
+COMMENT_COLUMNS = (
+    Comment.id, Comment.parent_id, Comment.content, Comment.created_at, Comment.user_id,
+    Comment.like_count, Comment.reply_count, User.username.label('author_name'),
+)
+
+def json_response(payload, status=200):
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, default=datetime.isoformat, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+def viewer_id():
+    # Lewat Flask-Login: login dari cookie remember-me ikut, user yang sudah dihapus dianggap anonim
+    return current_user.id if current_user.is_authenticated else None
+
+def page_size(default_key):
+    limit = request.args.get('limit', current_app.config[default_key], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+def liked_ids(like_model, like_column, target_ids, user_id):
+    if not user_id or not target_ids:
+        return set()
+    return set(db.session.execute(db.select(like_column).where(
+        like_model.user_id == user_id, like_column.in_(target_ids))).scalars())
+
+def serialize_story(row, liked, user_id):
+    return {
+        'id': row.id,
+        'content': row.content,
+        'is_anonymous': row.is_anonymous,
+        'image_url': url_for('static', filename=variant_url(row)) if row.image_url else None,
+        'created_at': row.created_at,
+        'author_name': 'Anonymous' if row.is_anonymous else row.author_name,
+        'like_count': row.like_count,
+        'comment_count': row.comment_count,
+        'user_has_liked': row.id in liked,
+        'can_delete': user_id is not None and user_id == row.user_id,
+    }
+
+def serialize_comment(row, liked, user_id):
+    return {
+        'id': row.id,
+        'parent_id': row.parent_id,
+        'content': row.content,
+        'created_at': row.created_at,
+        'author_name': row.author_name,
+        'like_count': row.like_count,
+        'reply_count': row.reply_count,
+        'user_has_liked': row.id in liked,
+        'can_delete': user_id is not None and user_id == row.user_id,
+    }
+
+@api.route('/stories')
+@read_only
+def stories():
+    category = request.args.get('category', 'latest')
+    limit = page_size('API_PAGE_SIZE')
+    user_id = viewer_id()
+    if category == 'for-you':
+        # Timeline per user dari build_timelines.py
+        if user_id is None:
+            return json_response({'error': 'Login diperlukan'}, 401)
+        sort_columns = [UserTimeline.score, UserTimeline.story_id]
+        statement = card_select(*sort_columns).join(UserTimeline, UserTimeline.story_id == Story.id).where(
+            UserTimeline.user_id == user_id)
+    else:
+        if category == 'latest':
+            sort_columns = [Story.created_at, Story.id]
+        else:  # popular
+            sort_columns = [popular_sort_column(), Story.id]
+        statement = card_select()
+        if sort_columns[0].key not in statement.selected_columns.keys():
+            statement = statement.add_columns(sort_columns[0])
+    cursor = request.args.get('cursor')
+    try:
+        if cursor:
+            statement = statement.where(keyset_condition(sort_columns, cursor))
+    except InvalidCursor:
+        return json_response({'error': 'Cursor tidak valid'}, 400)
+    statement = statement.order_by(*[column.desc() for column in sort_columns]).limit(limit + 1)
+    rows, cursor_token = next_cursor(db.session.execute(statement).all(), sort_columns, limit)
+    liked = liked_ids(StoryLike, StoryLike.story_id, [row.id for row in rows], user_id)
+    return json_response({
+        'stories': [serialize_story(row, liked, user_id) for row in rows],
+        'has_next': cursor_token is not None,
+        'next_cursor': cursor_token,
+    })
+
+@api.route('/stories/<int:story_id>')
+@read_only
+def story_detail(story_id):
+    user_id = viewer_id()
+    row = db.session.execute(card_select().where(Story.id == story_id)).first()
+    if row is None:
+        return json_response({'error': 'Curhatan tidak ditemukan'}, 404)
+    liked = liked_ids(StoryLike, StoryLike.story_id, [story_id], user_id)
+    return json_response({'story': serialize_story(row, liked, user_id)})
+
+@api.route('/stories/<int:story_id>/comments')
+@read_only
+def story_comments(story_id):
+    # Daftar datar urut waktu (lama -> baru); klien menyusun pohon lewat parent_id
+    limit = page_size('API_COMMENTS_PAGE_SIZE')
+    sort_columns = [Comment.created_at, Comment.id]
+    statement = db.select(*COMMENT_COLUMNS).join(User, User.id == Comment.user_id).where(
+        Comment.story_id == story_id)
+    cursor = request.args.get('cursor')
+    try:
+        if cursor:
+            statement = statement.where(keyset_condition(sort_columns, cursor, descending=False))
+    except InvalidCursor:
+        return json_response({'error': 'Cursor tidak valid'}, 400)
+    statement = statement.order_by(*sort_columns).limit(limit + 1)
+    user_id = viewer_id()
+    rows = db.session.execute(statement).all()
+    if not rows and not cursor:
+        # Bedakan story tanpa komentar dari story yang tidak ada
+        if db.session.execute(db.select(Story.id).where(Story.id == story_id)).first() is None:
+            return json_response({'error': 'Curhatan tidak ditemukan'}, 404)
+    rows, cursor_token = next_cursor(rows, sort_columns, limit)
+    liked = liked_ids(CommentLike, CommentLike.comment_id, [row.id for row in rows], user_id)
+    return json_response({
+        'comments': [serialize_comment(row, liked, user_id) for row in rows],
+        'has_next': cursor_token is not None,
+        'next_cursor': cursor_token,
+    })
@@ -1,15 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, g
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from models import db, User, Story, Comment, StoryLike, CommentLike, Notification
-from config import Config
-from datetime import datetime
-import os
+from models import db, User, UserStats, Story, Comment, StoryLike, CommentLike, Notification
+from config import Config, get_indonesia_time
+from database import init_app as init_database, read_only
+from counters import (bump_story_comments, bump_comment_replies, bump_user_stats, bump_comments_written,
+                      comment_subtree_ids, reconcile_user_stats)
+from ranking import popular_sort_column, refresh_story_rank
+from feed import latest_cards, popular_cards, for_you_cards, card_query, paginate_cards, user_cards
+from comment_tree import load_comment_tree
+from pagination import keyset_page, InvalidCursor
+from search_index import search_stories as run_search
+from images import save_upload, release_upload, purge_orphan, schedule_image_processing, variant_url
+from assets import pipeline as asset_pipeline
+from fragment_cache import cache as fragment_cache
+from response_cache import cache as response_cache
+from like_buffer import buffer as like_buffer, LikeBufferBusy
+from instrumentation import instrumentation
+from api_v2 import api as api_v2
+from realtime import hub as realtime_hub, publish_story_counts, format_event, story_channel, user_channel
+from notifications import (dispatcher as notification_dispatcher, queue_notification, release_unread,
+                           mark_notifications_read)
 
 app = Flask(__name__)
 app.config.from_object(Config)
-db.init_app(app)
+instrumentation.init_app(app)
+init_database(app, db)
+notification_dispatcher.init_app(app)
+asset_pipeline.init_app(app)
+fragment_cache.init_app(app)
+response_cache.init_app(app)
+like_buffer.init_app(app)
+realtime_hub.init_app(app)
+app.register_blueprint(api_v2)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -21,92 +44,76 @@ def load_user(user_id):
     return db.session.get(User, int(user_id))
 
 # Helper functions
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
-
-def save_image(file):
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        unique_filename = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{filename}"
-        
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        try:
-            from PIL import Image
-            image = Image.open(file)
-            if image.width > 800:
-                ratio = 800 / image.width
-                new_height = int(image.height * ratio)
-                image = image.resize((800, new_height), Image.Resampling.LANCZOS)
-            
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            image.save(image_path, optimize=True, quality=85)
-        except ImportError:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(image_path)
-        
-        return f"uploads/{unique_filename}"
-    return None
-
 def is_story_liked_by_user(story_id, user_id):
     if not user_id:
         return False
     return StoryLike.query.filter_by(story_id=story_id, user_id=user_id).first() is not None
 
-def is_comment_liked_by_user(comment_id, user_id):
-    if not user_id:
-        return False
-    return CommentLike.query.filter_by(comment_id=comment_id, user_id=user_id).first() is not None
-
-def get_comments_with_replies(story_id):
-    return Comment.query.filter_by(story_id=story_id, parent_id=None).order_by(Comment.created_at.asc()).all()
-
-def create_notification(user_id, story_id=None, comment_id=None, type='', message=''):
-    notification = Notification(
-        user_id=user_id,
-        story_id=story_id,
-        comment_id=comment_id,
-        type=type,
-        message=message
-    )
-    db.session.add(notification)
-    db.session.commit()
-
-def get_unread_notifications_count(user_id):
-    return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+def get_liked_story_ids(story_ids, user_id):
+    # Satu query IN (...) untuk semua story di halaman, bukan satu query per story
+    story_ids = set(story_ids)
+    if not user_id or not story_ids:
+        return set()
+    rows = db.session.query(StoryLike.story_id).filter(
+        StoryLike.user_id == user_id,
+        StoryLike.story_id.in_(story_ids)
+    ).all()
+    return {row.story_id for row in rows}
+
+def mark_liked_stories(stories, user_id):
+    stories = list(stories)
+    liked_ids = get_liked_story_ids([story.id for story in stories], user_id)
+    for story in stories:
+        story.user_has_liked = story.id in liked_ids
+    return stories
+
+def current_user_id():
+    return current_user.id if current_user.is_authenticated else None
+
+def get_unread_notifications_count(user):
+    # Dibaca dari counter di baris user yang sudah dimuat Flask-Login, tanpa query tambahan
+    return max(user.unread_notification_count or 0, 0)
+
+@app.errorhandler(LikeBufferBusy)
+def like_buffer_busy(error):
+    app.logger.warning('%s', error)
+    return jsonify({'error': 'Server sedang sibuk, coba lagi sebentar.'}), 503
 
 @app.context_processor
 def inject_notifications():
     if current_user.is_authenticated:
-        unread_count = get_unread_notifications_count(current_user.id)
+        unread_count = get_unread_notifications_count(current_user)
         return dict(unread_notifications_count=unread_count)
     return dict(unread_notifications_count=0)
 
 # ===== ROUTES ===== (HANYA SATU SET ROUTE)
 
 @app.route('/')
+@response_cache.cached
+@read_only
 def index():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 6
     
-    latest_stories_pagination = Story.query.order_by(Story.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        latest_stories_page = latest_cards(per_page, cursor)
+    except InvalidCursor:
+        return redirect(url_for('index'))
     
-    popular_stories = db.session.query(Story).outerjoin(StoryLike).group_by(Story.id).order_by(
-        db.func.count(StoryLike.id).desc()
-    ).limit(6).all()
+    popular_stories_page = popular_cards(limit=6)
     
-    for story in latest_stories_pagination.items:
-        story.user_has_liked = is_story_liked_by_user(story.id, current_user.id if current_user.is_authenticated else None)
+    # Feed "Untukmu" dibaca dari timeline yang sudah dihitung (build_timelines.py)
+    for_you_page = for_you_cards(current_user.id, per_page) if current_user.is_authenticated else None
     
-    for story in popular_stories:
-        story.user_has_liked = is_story_liked_by_user(story.id, current_user.id if current_user.is_authenticated else None)
+    # Status like untuk semua tab di-resolve sekaligus
+    mark_liked_stories(latest_stories_page.items + popular_stories_page.items +
+                       (for_you_page.items if for_you_page else []), current_user_id())
     
     return render_template('index.html', 
-                         stories=latest_stories_pagination, 
-                         popular_stories=popular_stories)
+                         stories=latest_stories_page, 
+                         popular_stories=popular_stories_page,
+                         for_you_stories=for_you_page,
+                         cursor=cursor)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -137,6 +144,7 @@ def register():
         
         hashed_password = generate_password_hash(password)
         user = User(username=username, email=email, password=hashed_password)
+        user.stats = UserStats()
         db.session.add(user)
         db.session.commit()
         
@@ -194,71 +202,59 @@ def post_story():
             flash('Konten terlalu panjang! Maksimal 1000 karakter.', 'error')
             return render_template('post_story.html')
         
-        # Handle image upload
-        image_url = None
+        # Handle image upload (file identik dipakai bersama, lihat images.py)
+        image_blob = None
         if image_file and image_file.filename != '':
-            image_url = save_image(image_file)
-            if not image_url:
+            image_blob = save_upload(image_file)
+            if not image_blob:
                 flash('Format gambar tidak didukung! Gunakan JPG, PNG, atau GIF.', 'error')
                 return render_template('post_story.html')
         
         story = Story(
             content=content.strip(),
             is_anonymous=is_anonymous,
-            image_url=image_url,
+            image_url=image_blob.path if image_blob else None,
+            image_variants=image_blob.variants if image_blob else None,
             user_id=current_user.id
         )
         db.session.add(story)
+        bump_user_stats(current_user.id, stories_count=1)
+        db.session.flush()
+        refresh_story_rank(story)
         db.session.commit()
+        
+        # Resize/encode variant gambar di background, setelah story tersimpan
+        if image_blob:
+            schedule_image_processing(image_blob)
+        
         flash('Curhatan berhasil diposting!', 'success')
         return redirect(url_for('index'))
     
     return render_template('post_story.html')
 
 @app.route('/story/<int:story_id>')
+@response_cache.cached
+@read_only
 def story_detail(story_id):
-    story = Story.query.get_or_404(story_id)
+    story = Story.query.options(db.joinedload(Story.author)).filter_by(id=story_id).first_or_404()
     
     # Preload like status for current user
-    story.user_has_liked = is_story_liked_by_user(story.id, current_user.id if current_user.is_authenticated else None)
+    story.user_has_liked = is_story_liked_by_user(story.id, current_user_id())
     
-    # Get comments with proper hierarchy
-    comments = get_comments_with_replies(story_id)
-    
-    # Preload like status for comments
-    for comment in comments:
-        comment.user_has_liked = is_comment_liked_by_user(comment.id, current_user.id if current_user.is_authenticated else None)
-        for reply in comment.replies:
-            reply.user_has_liked = is_comment_liked_by_user(reply.id, current_user.id if current_user.is_authenticated else None)
+    # Pohon komentar (semua level) + status like, jumlah query tetap
+    comments = load_comment_tree(story_id, current_user_id())
     
     return render_template('story_detail.html', story=story, comments=comments)
 
 @app.route('/like_story/<int:story_id>', methods=['POST'])
 @login_required
 def like_story(story_id):
-    story = Story.query.get_or_404(story_id)
-    existing_like = StoryLike.query.filter_by(user_id=current_user.id, story_id=story_id).first()
+    Story.query.get_or_404(story_id)
     
-    if existing_like:
-        db.session.delete(existing_like)
-        liked = False
-    else:
-        like = StoryLike(user_id=current_user.id, story_id=story_id)
-        db.session.add(like)
-        liked = True
-        
-        # Buat notifikasi hanya jika bukan pemilik story
-        if story.user_id != current_user.id:
-            create_notification(
-                user_id=story.user_id,
-                story_id=story_id,
-                type='story_like',
-                message=f'{current_user.username} menyukai curhatan Anda'
-            )
+    # Ditulis per batch bersama toggle lain (like_buffer.py), notifikasi ikut di batch itu
+    liked, like_count = like_buffer.toggle('story', story_id, current_user)
+    fragment_cache.invalidate('story', story_id)
     
-    db.session.commit()
-    
-    like_count = StoryLike.query.filter_by(story_id=story_id).count()
     return jsonify({'liked': liked, 'like_count': like_count})
 
 @app.route('/comment/<int:story_id>', methods=['POST'])
@@ -272,67 +268,67 @@ def add_comment(story_id):
         flash('Komentar tidak boleh kosong!', 'error')
         return redirect(url_for('story_detail', story_id=story_id))
     
+    parent_comment = None
+    if parent_id:
+        parent_comment = Comment.query.filter_by(id=parent_id, story_id=story_id).first()
+        if not parent_comment:
+            flash('Komentar yang dibalas tidak ditemukan!', 'error')
+            return redirect(url_for('story_detail', story_id=story_id))
+    
     comment = Comment(
         content=content,
         user_id=current_user.id,
         story_id=story_id,
-        parent_id=parent_id if parent_id else None
+        parent_id=parent_comment.id if parent_comment else None
     )
     db.session.add(comment)
-    db.session.commit()
-    
-    # Buat notifikasi
-    if parent_id:
+    bump_story_comments(story, 1)
+    bump_user_stats(current_user.id, comments_written=1)
+    bump_user_stats(story.user_id, comments_received=1)
+    if parent_comment:
+        bump_comment_replies(parent_comment, 1)
+    db.session.flush()
+    
+    # Buat notifikasi (dikirim ke worker setelah commit di bawah)
+    if parent_comment:
         # Ini adalah reply
-        parent_comment = Comment.query.get(parent_id)
-        if parent_comment and parent_comment.user_id != current_user.id:
-            create_notification(
+        if parent_comment.user_id != current_user.id:
+            queue_notification(
                 user_id=parent_comment.user_id,
                 story_id=story_id,
                 comment_id=comment.id,
                 type='reply',
-                message=f'{current_user.username} membalas komentar Anda'
+                actor=current_user
             )
     else:
         # Ini adalah komentar baru
         if story.user_id != current_user.id:
-            create_notification(
+            queue_notification(
                 user_id=story.user_id,
                 story_id=story_id,
                 comment_id=comment.id,
                 type='new_comment',
-                message=f'{current_user.username} mengomentari curhatan Anda'
+                actor=current_user
             )
     
+    # Counter dibaca ulang di transaksi ini, dikirim ke pembaca story setelah commit
+    publish_story_counts(story)
+    db.session.commit()
+    fragment_cache.invalidate('story', story_id)
+    if parent_comment:
+        fragment_cache.invalidate('comment', parent_comment.id)
+    
     flash('Komentar berhasil ditambahkan!', 'success')
     return redirect(url_for('story_detail', story_id=story_id))
 
 @app.route('/like_comment/<int:comment_id>', methods=['POST'])
 @login_required
 def like_comment(comment_id):
-    comment = Comment.query.get_or_404(comment_id)
-    existing_like = CommentLike.query.filter_by(user_id=current_user.id, comment_id=comment_id).first()
+    Comment.query.get_or_404(comment_id)
     
-    if existing_like:
-        db.session.delete(existing_like)
-        liked = False
-    else:
-        like = CommentLike(user_id=current_user.id, comment_id=comment_id)
-        db.session.add(like)
-        liked = True
-        
-        # Buat notifikasi hanya jika bukan pemilik comment
-        if comment.user_id != current_user.id:
-            create_notification(
-                user_id=comment.user_id,
-                comment_id=comment_id,
-                type='comment_like',
-                message=f'{current_user.username} menyukai komentar Anda'
-            )
+    liked, like_count = like_buffer.toggle('comment', comment_id, current_user)
+    fragment_cache.invalidate('comment', comment_id)
     
-    db.session.commit()
-    
-    like_count = CommentLike.query.filter_by(comment_id=comment_id).count()
     return jsonify({'liked': liked, 'like_count': like_count})
 
 @app.route('/delete_story/<int:story_id>', methods=['POST'])
@@ -344,8 +340,19 @@ def delete_story(story_id):
         flash('Anda tidak memiliki akses untuk menghapus curhatan ini!', 'error')
         return redirect(url_for('index'))
     
+    # Notifikasi story ikut terhapus (cascade), jaga counter belum dibaca tetap benar
+    release_unread(db.or_(
+        Notification.story_id == story.id,
+        Notification.comment_id.in_(db.select(Comment.id).where(Comment.story_id == story.id))
+    ))
+    bump_user_stats(story.user_id, stories_count=-1, likes_received=-story.like_count,
+                    comments_received=-story.comment_count)
+    bump_comments_written(db.select(Comment.id).where(Comment.story_id == story.id), sign=-1)
+    orphan_image = release_upload(story.image_url)
     db.session.delete(story)
     db.session.commit()
+    fragment_cache.invalidate('story', story_id)
+    purge_orphan(orphan_image)
     flash('Curhatan berhasil dihapus!', 'success')
     return redirect(url_for('index'))
 
@@ -374,37 +381,35 @@ def edit_story(story_id):
             return render_template('post_story.html', story=story)
 
         # Handle image upload or removal
+        image_blob = None
+        orphan_image = None
         if image_file and image_file.filename != '':
-            image_url = save_image(image_file)
-            if not image_url:
+            image_blob = save_upload(image_file)
+            if not image_blob:
                 flash('Format gambar tidak didukung! Gunakan JPG, PNG, atau GIF.', 'error')
                 return render_template('post_story.html', story=story)
 
-            # Remove old image file if present
-            if story.image_url:
-                old_path = os.path.join(app.root_path, 'static', story.image_url)
-                try:
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-                except Exception:
-                    pass
-
-            story.image_url = image_url
+            # Referensi baru diambil dulu, baru yang lama dilepas (aman jika file-nya sama)
+            orphan_image = release_upload(story.image_url)
+            story.image_url = image_blob.path
+            story.image_variants = image_blob.variants
         else:
             if remove_image:
-                if story.image_url:
-                    old_path = os.path.join(app.root_path, 'static', story.image_url)
-                    try:
-                        if os.path.exists(old_path):
-                            os.remove(old_path)
-                    except Exception:
-                        pass
+                orphan_image = release_upload(story.image_url)
                 story.image_url = None
+                story.image_variants = None
 
         story.content = content.strip()
         story.is_anonymous = is_anonymous
+        story.updated_at = get_indonesia_time()
 
         db.session.commit()
+        fragment_cache.invalidate('story', story.id)
+
+        # File lama hanya dihapus jika tidak ada story lain yang memakainya
+        purge_orphan(orphan_image)
+        if image_blob:
+            schedule_image_processing(image_blob)
         flash('Curhatan berhasil diperbarui!', 'success')
         return redirect(url_for('story_detail', story_id=story.id))
 
@@ -421,40 +426,99 @@ def delete_comment(comment_id):
         flash('Anda tidak memiliki akses untuk menghapus komentar ini!', 'error')
         return redirect(url_for('story_detail', story_id=story_id))
     
+    # Balasan ikut terhapus (cascade), jadi kurangi counter story sebanyak seluruh subtree
+    subtree_ids = comment_subtree_ids(comment)
+    bump_story_comments(comment.story, -len(subtree_ids))
+    bump_user_stats(comment.story.user_id, comments_received=-len(subtree_ids))
+    bump_comments_written(subtree_ids, sign=-1)
+    release_unread(Notification.comment_id.in_(subtree_ids))
+    parent_id = comment.parent_id
+    if comment.parent:
+        bump_comment_replies(comment.parent, -1)
+    
     db.session.delete(comment)
     db.session.commit()
+    fragment_cache.invalidate('story', story_id)
+    fragment_cache.invalidate('comment', parent_id, *subtree_ids)
     flash('Komentar berhasil dihapus!', 'success')
     return redirect(url_for('story_detail', story_id=story_id))
 
 @app.route('/profile')
 @login_required
+@read_only
 def profile():
-    # Hitung statistik user
-    user_stories = Story.query.filter_by(user_id=current_user.id).count()
-    
-    # Hitung total likes yang diterima dari semua story user
-    user_likes = db.session.query(StoryLike).join(Story).filter(Story.user_id == current_user.id).count()
-    
-    user_comments = Comment.query.filter_by(user_id=current_user.id).count()
+    # Statistik dari tabel user_stats (satu lookup primary key), bukan COUNT/JOIN per view
+    stats = db.session.get(UserStats, current_user.id)
+    if stats is None:
+        # Baris baru ditulis ke primary; hitung dan baca ulang dari primary juga,
+        # replica belum tentu sudah menerimanya
+        g.use_replica = False
+        reconcile_user_stats([current_user.id])
+        stats = db.session.get(UserStats, current_user.id)
     
     # Stories terbaru user
-    recent_stories = Story.query.filter_by(user_id=current_user.id).order_by(Story.created_at.desc()).limit(5).all()
+    recent_stories = user_cards(current_user.id, 5, preview_chars=100)
     
     return render_template('profile.html', 
-                         user_stories=user_stories,
-                         user_likes=user_likes,
-                         user_comments=user_comments,
+                         user_stories=stats.stories_count,
+                         user_likes=stats.likes_received,
+                         user_comments=stats.comments_written,
+                         comments_received=stats.comments_received,
                          recent_stories=recent_stories)
 
 @app.route('/notifications')
 @login_required
 def notifications():
-    # Tandai semua notifikasi sebagai dibaca
-    Notification.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True})
-    db.session.commit()
+    cursor = request.args.get('cursor')
+    per_page = app.config['NOTIFICATIONS_PER_PAGE']
     
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
-    return render_template('notifications.html', notifications=notifications)
+    try:
+        notifications_page = keyset_page(
+            Notification.query.filter_by(user_id=current_user.id),
+            [Notification.created_at, Notification.id], per_page, cursor
+        )
+    except InvalidCursor:
+        return redirect(url_for('notifications'))
+    
+    # Tandai dibaca hanya notifikasi yang tampil di halaman ini
+    newly_read_ids = mark_notifications_read(current_user, notifications_page.items)
+    
+    return render_template('notifications.html',
+                         notifications=notifications_page.items,
+                         next_cursor=notifications_page.next_cursor,
+                         newly_read_ids=newly_read_ids,
+                         cursor=cursor)
+
+@app.route('/notifications/unread_count')
+@login_required
+def notifications_unread_count():
+    # Endpoint polling ringan untuk badge notifikasi (fallback jika browser tanpa EventSource)
+    return jsonify({'unread_count': get_unread_notifications_count(current_user)})
+
+@app.route('/metrics')
+def metrics():
+    # Format teks Prometheus; lihat instrumentation.py
+    return instrumentation.metrics_response()
+
+@app.route('/stream')
+def stream():
+    # Server-sent events: notifikasi user dan counter story yang sedang ditampilkan (?stories=1,2,3)
+    story_ids = dict.fromkeys(int(value) for value in request.args.get('stories', '').split(',') if value.isdigit())
+    if not current_user.is_authenticated and len(story_ids) > 1:
+        # Pengunjung anonim hanya mengikuti halaman detail (satu story), bukan daftar
+        # story di index: tiap koneksi terbuka memegang satu worker thread
+        return '', 204
+    channels = [story_channel(story_id) for story_id in list(story_ids)[:app.config['REALTIME_MAX_STORIES']]]
+    initial = []
+    if current_user.is_authenticated:
+        channels.append(user_channel(current_user.id))
+        # Badge disamakan dulu, event yang terlewat selama reconnect tidak hilang
+        initial.append(format_event('notification', {
+            'unread_count': get_unread_notifications_count(current_user)}))
+    if not channels:
+        # 204 membuat EventSource berhenti mencoba reconnect
+        return '', 204
+    return realtime_hub.stream(channels, initial)
 
 @app.route('/delete_notification/<int:notification_id>', methods=['POST'])
 @login_required
@@ -465,6 +529,8 @@ def delete_notification(notification_id):
         flash('Anda tidak memiliki akses untuk menghapus notifikasi ini!', 'error')
         return redirect(url_for('notifications'))
     
+    if not notification.is_read:
+        current_user.unread_notification_count = User.unread_notification_count - 1
     db.session.delete(notification)
     db.session.commit()
     flash('Notifikasi berhasil dihapus!', 'success')
@@ -474,27 +540,25 @@ def delete_notification(notification_id):
 @login_required
 def clear_notifications():
     Notification.query.filter_by(user_id=current_user.id).delete()
+    current_user.unread_notification_count = 0
     db.session.commit()
     flash('Semua notifikasi berhasil dihapus!', 'success')
     return redirect(url_for('notifications'))
 
 @app.route('/search')
+@response_cache.cached
+@read_only
 def search_stories():
     query = request.args.get('q', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 6
     
     if query:
-        # Search dengan pagination
-        stories_pagination = Story.query.filter(
-            Story.content.ilike(f'%{query}%')
-        ).order_by(Story.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Full-text search (FTS5) dengan ranking relevansi + pagination
+        stories_pagination = run_search(query, page, per_page)
         
         # Preload like status
-        for story in stories_pagination.items:
-            story.user_has_liked = is_story_liked_by_user(story.id, current_user.id if current_user.is_authenticated else None)
+        mark_liked_stories(stories_pagination.items, current_user_id())
     else:
         stories_pagination = None
     
@@ -503,46 +567,73 @@ def search_stories():
                          query=query,
                          page=page)
 
+def serialize_story(story):
+    # ✅ PERBAIKI: Gunakan url_for untuk generate image URL
+    image_url = None
+    if story.image_url:
+        image_url = url_for('static', filename=variant_url(story), _external=False)
+
+    return {
+        'id': story.id,
+        'content': story.content,
+        'is_anonymous': story.is_anonymous,
+        'image_url': image_url,  # ✅ Sekarang pakai URL yang benar
+        'created_at': story.created_at.strftime('%d %b %Y %H:%M'),
+        'author_name': 'Anonymous' if story.is_anonymous else story.author_name,
+        'like_count': story.like_count,
+        'comment_count': story.comment_count,
+        'user_has_liked': story.user_has_liked,
+        'can_delete': current_user.is_authenticated and current_user.id == story.user_id
+    }
+
 @app.route('/api/stories')
+@response_cache.cached
+@read_only
 def api_stories():
-    page = request.args.get('page', 1, type=int)
     per_page = 6
     category = request.args.get('category', 'latest')
     
+    if 'page' in request.args:
+        return api_stories_by_page(category, per_page)
+    
+    # Mode cursor (default): seek lewat index, tanpa COUNT(*) maupun OFFSET
+    cursor = request.args.get('cursor')
+    if category == 'for-you' and not current_user.is_authenticated:
+        return jsonify({'error': 'Login diperlukan'}), 401
+    try:
+        if category == 'latest':
+            stories_page = latest_cards(per_page, cursor)
+        elif category == 'for-you':
+            stories_page = for_you_cards(current_user.id, per_page, cursor)
+        else:  # popular
+            stories_page = popular_cards(limit=per_page, cursor=cursor)
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor tidak valid'}), 400
+    
+    # Preload like status
+    mark_liked_stories(stories_page.items, current_user_id())
+    
+    return jsonify({
+        'stories': [serialize_story(story) for story in stories_page.items],
+        'has_next': stories_page.has_next,
+        'next_cursor': stories_page.next_cursor
+    })
+
+def api_stories_by_page(category, per_page):
+    # Mode lama (?page=N) tetap didukung untuk klien yang belum pindah ke cursor
+    page = request.args.get('page', 1, type=int)
+    
     if category == 'latest':
-        stories_query = Story.query.order_by(Story.created_at.desc())
+        stories_query = card_query().order_by(Story.created_at.desc(), Story.id.desc())
     else:  # popular
-        stories_query = db.session.query(Story).outerjoin(StoryLike).group_by(Story.id).order_by(
-            db.func.count(StoryLike.id).desc()
-        )
+        stories_query = card_query().order_by(popular_sort_column().desc(), Story.id.desc())
     
-    stories_pagination = stories_query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    stories_pagination = paginate_cards(stories_query, page, per_page)
     
     # Preload like status
-    for story in stories_pagination.items:
-        story.user_has_liked = is_story_liked_by_user(story.id, current_user.id if current_user.is_authenticated else None)
-    
-    stories_data = []
-    for story in stories_pagination.items:
-        # ✅ PERBAIKI: Gunakan url_for untuk generate image URL
-        image_url = None
-        if story.image_url:
-            image_url = url_for('static', filename=story.image_url, _external=False)
-        
-        stories_data.append({
-            'id': story.id,
-            'content': story.content,
-            'is_anonymous': story.is_anonymous,
-            'image_url': image_url,  # ✅ Sekarang pakai URL yang benar
-            'created_at': story.created_at.strftime('%d %b %Y %H:%M'),
-            'author_name': 'Anonymous' if story.is_anonymous else story.author.username,
-            'like_count': len(story.likes),
-            'comment_count': len(story.comments),
-            'user_has_liked': story.user_has_liked,
-            'can_delete': current_user.is_authenticated and current_user.id == story.user_id
-        })
+    mark_liked_stories(stories_pagination.items, current_user_id())
+    
+    stories_data = [serialize_story(story) for story in stories_pagination.items]
     
     return jsonify({
         'stories': stories_data,
@@ -550,9 +641,3 @@ def api_stories():
         'next_page': stories_pagination.next_num if stories_pagination.has_next else None,
         'total_pages': stories_pagination.pages
     })
-
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-    print("🚀 Server starting on http://localhost:5000")
-    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,161 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # opsional: tanpa brotli hanya dibuat varian .gz
+    brotli = None
+
+# CSS/JS di static/ di-fingerprint saat startup (atau lewat build_assets.py):
+# salinan bernama style.<hash>.css ditulis ke static/dist/ bersama varian .gz/.br,
+# dan manifest.json memetakan nama asli -> nama ber-hash. url_for('static', ...)
+# otomatis memakai nama ber-hash, jadi template tidak perlu diubah.
+#
+# Karena isi di URL ber-hash tidak pernah berubah, file itu (dan upload
+# content-addressed, lihat images.py) dikirim dengan Cache-Control immutable
+# sehingga browser tidak perlu request ulang sama sekali. ETag file tersebut
+# diambil dari hash di namanya (bukan mtime/ukuran bawaan Werkzeug), jadi sama
+# di semua server dan di setiap deploy.
+
+SOURCE_DIRS = ('css', 'js')
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+CONTENT_ADDRESSED_UPLOAD = re.compile(r'^uploads/[0-9a-f]{2}/[0-9a-f]{64}[._]')
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+def fingerprint_name(filename, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    base, ext = os.path.splitext(filename)
+    return f"{DIST_DIR}/{base}.{digest}{ext}"
+
+def compressed_variants(data):
+    # mtime=0 supaya isi .gz sama persis di semua server, sesuai ETag-nya (lihat content_etag)
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return variants
+
+def content_etag(filename, encoding=None):
+    # Nama file ber-hash sudah mewakili isinya; tiap varian encoding punya ETag sendiri
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return f'{stem}-{encoding}' if encoding else stem
+
+def build_assets(static_folder):
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        root = os.path.join(static_folder, source_dir)
+        for dirpath, _, filenames in os.walk(root):
+            for name in sorted(filenames):
+                if not name.endswith(FINGERPRINT_EXTENSIONS):
+                    continue
+                source_path = os.path.join(dirpath, name)
+                filename = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+                with open(source_path, 'rb') as handle:
+                    data = handle.read()
+
+                hashed = fingerprint_name(filename, data)
+                target = os.path.join(static_folder, hashed)
+                if not os.path.exists(target):
+                    _write_atomic(target, data)
+                    for encoding, compressed in compressed_variants(data).items():
+                        # Simpan hanya jika memang lebih kecil
+                        if len(compressed) < len(data):
+                            _write_atomic(target + ENCODING_SUFFIXES[encoding], compressed)
+                manifest[filename] = hashed
+
+    _write_atomic(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+def prune_stale_assets(static_folder, manifest):
+    # Hapus hasil build lama yang tidak ada lagi di manifest
+    dist_root = os.path.join(static_folder, DIST_DIR)
+    keep = set(manifest.values())
+    removed = 0
+    for dirpath, _, filenames in os.walk(dist_root):
+        for name in filenames:
+            if name == MANIFEST_NAME:
+                continue
+            path = os.path.join(dirpath, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            for suffix in ENCODING_SUFFIXES.values():
+                if filename.endswith(suffix):
+                    filename = filename[:-len(suffix)]
+            if filename not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+class AssetPipeline:
+    def __init__(self, app=None):
+        self.app = None
+        self.manifest = {}
+        self.hashed_files = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['assets'] = self
+        if app.config['ASSET_FINGERPRINT']:
+            self.manifest = build_assets(app.static_folder)
+            self.hashed_files = set(self.manifest.values())
+        app.url_defaults(self._rewrite_static_url)
+        app.view_functions['static'] = self.serve
+
+    def _rewrite_static_url(self, endpoint, values):
+        if endpoint == 'static':
+            hashed = self.manifest.get(values.get('filename'))
+            if hashed:
+                values['filename'] = hashed
+
+    def is_immutable(self, filename):
+        return filename in self.hashed_files or CONTENT_ADDRESSED_UPLOAD.match(filename) is not None
+
+    def _pick_encoding(self, filename):
+        if filename not in self.hashed_files:
+            return None
+        static_folder = self.app.static_folder
+        available = [encoding for encoding, suffix in ENCODING_SUFFIXES.items()
+                     if os.path.isfile(os.path.join(static_folder, filename + suffix))]
+        if not available:
+            return None
+        return request.accept_encodings.best_match(available)
+
+    def serve(self, filename):
+        static_folder = self.app.static_folder
+        immutable = self.is_immutable(filename)
+        max_age = self.app.config['ASSET_MAX_AGE'] if immutable else None
+        encoding = self._pick_encoding(filename)
+        etag = content_etag(filename, encoding) if immutable else True
+
+        if encoding:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(static_folder, filename + ENCODING_SUFFIXES[encoding],
+                                           mimetype=mimetype, max_age=max_age, etag=etag)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(static_folder, filename, max_age=max_age, etag=etag)
+
+        if filename in self.hashed_files:
+            response.vary.add('Accept-Encoding')
+        if immutable:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        return response
+
+pipeline = AssetPipeline()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from app import app
+from models import db, User, Story, Comment
+
+# Benchmark route utama lewat Flask test client (tanpa jaringan), dengan beberapa
+# thread sekaligus. Per skenario dilaporkan latency p50/p95/p99, rata-rata query
+# SQL per request dan throughput. Hasil bisa disimpan (--save) lalu dibandingkan
+# dengan run berikutnya (--compare); exit code 1 jika p95 atau jumlah query naik
+# melebihi --tolerance, jadi bisa dipasang sebelum deploy.
+#
+#   python generate_bulk_data.py --reset --stories 100000
+#   python benchmark.py --save baseline.json
+#   python benchmark.py --compare baseline.json
+
+SEARCH_TERMS = ['sedih', 'bahagia', 'kerja', 'teman', 'masa depan', 'healing', 'kuliah']
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def build_scenarios(story_ids, comment_ids, search_terms):
+    # Story dipilih dengan bobot 1/rank: story populer lebih sering dibuka
+    weights = [1 / rank for rank in range(1, len(story_ids) + 1)]
+
+    def popular_story():
+        return random.choices(story_ids, weights)[0]
+
+    return {
+        'index': lambda client: client.get('/'),
+        'api_latest': lambda client: client.get('/api/stories'),
+        'api_popular': lambda client: client.get('/api/stories?category=popular'),
+        'api_v2_latest': lambda client: client.get('/api/v2/stories'),
+        'api_v2_popular': lambda client: client.get('/api/v2/stories?category=popular'),
+        'api_v2_for_you': lambda client: client.get('/api/v2/stories?category=for-you'),
+        'search': lambda client: client.get('/search', query_string={'q': random.choice(search_terms)}),
+        'story_detail': lambda client: client.get(f'/story/{popular_story()}'),
+        'like_story': lambda client: client.post(f'/like_story/{popular_story()}'),
+        'like_comment': lambda client: client.post(f'/like_comment/{random.choice(comment_ids)}'),
+    }
+
+def run_scenario(name, request, clients, total):
+    latencies = []
+    queries = []
+    errors = []
+    lock = threading.Lock()
+    remaining = iter(range(total))
+
+    def worker(client):
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            response = request(client)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed * 1000)
+                # Dihitung instrumentation.py (X-Query-Count)
+                queries.append(int(response.headers.get('X-Query-Count', 0)))
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_per_request': round(statistics.mean(queries), 2),
+        'throughput_rps': round(len(latencies) / duration, 1),
+    }
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('p95_ms', 'queries_per_request'):
+            if result[metric] > previous[metric] * (1 + tolerance) and result[metric] - previous[metric] > 0.5:
+                regressions.append(f"{name}.{metric}: {previous[metric]} -> {result[metric]}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark route Curhatin')
+    parser.add_argument('--requests', type=int, default=300, help='request per skenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scenarios', default=None, help='daftar dipisah koma, default semua')
+    parser.add_argument('--anonymous', action='store_true', help='tanpa login (skenario like dan for-you dilewati)')
+    parser.add_argument('--no-cache', action='store_true', help='matikan response & fragment cache')
+    parser.add_argument('--save', help='simpan hasil ke file JSON')
+    parser.add_argument('--compare', help='bandingkan dengan hasil JSON sebelumnya')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='kenaikan maksimum sebelum dianggap regresi')
+    args = parser.parse_args()
+
+    random.seed(1)
+    app.config['TESTING'] = True
+    app.config['QUERY_DEBUG_HEADER'] = True
+    if args.no_cache:
+        app.config['RESPONSE_CACHE_SIZE'] = 0
+        app.extensions['fragment_cache'].max_entries = 0
+
+    with app.app_context():
+        story_ids = [row.id for row in db.session.query(Story.id).order_by(
+            Story.like_count.desc()).limit(1000)]
+        comment_ids = [row.id for row in db.session.query(Comment.id).order_by(
+            Comment.like_count.desc()).limit(1000)]
+        usernames = [row.username for row in db.session.query(User.username).order_by(User.id).limit(args.concurrency)]
+    if not story_ids:
+        print("❌ Belum ada data; jalankan generate_bulk_data.py dulu")
+        sys.exit(1)
+
+    clients = []
+    for index in range(args.concurrency):
+        client = app.test_client()
+        if not args.anonymous and usernames:
+            client.post('/login', data={'username': usernames[index % len(usernames)], 'password': 'password123'})
+        clients.append(client)
+
+    scenarios = build_scenarios(story_ids, comment_ids or [0], SEARCH_TERMS)
+    if args.anonymous:
+        scenarios = {name: request for name, request in scenarios.items()
+                     if not name.startswith('like_') and name != 'api_v2_for_you'}
+    if args.scenarios:
+        scenarios = {name: scenarios[name] for name in args.scenarios.split(',')}
+
+    results = {}
+    print(f"{'skenario':<14}{'req':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'query':>8}{'req/s':>9}")
+    for name, request in scenarios.items():
+        # Pemanasan: isi cache template/koneksi dulu
+        for client in clients:
+            request(client)
+        result = run_scenario(name, request, clients, args.requests)
+        results[name] = result
+        print(f"{name:<14}{result['requests']:>6}{result['errors']:>5}{result['p50_ms']:>9}"
+              f"{result['p95_ms']:>9}{result['p99_ms']:>9}{result['queries_per_request']:>8}"
+              f"{result['throughput_rps']:>9}")
+    app.extensions['like_buffer'].flush()
+
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Hasil disimpan ke {args.save}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print("❌ Regresi terdeteksi:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("✅ Tidak ada regresi dibanding baseline")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+from app import app
+from assets import build_assets, prune_stale_assets
+
+with app.app_context():
+    # Fingerprint CSS/JS ke static/dist/ (juga otomatis saat app start),
+    # lalu hapus hasil build lama yang sudah tidak dipakai
+    manifest = build_assets(app.static_folder)
+    for filename, hashed in sorted(manifest.items()):
+        print(f"📦 {filename} -> {hashed}")
+    removed = prune_stale_assets(app.static_folder, manifest)
+    print(f"🧹 {removed} file lama dihapus")
+    print(f"✅ {len(manifest)} asset siap!")
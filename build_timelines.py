@@ -0,0 +1,9 @@
+import time
+from app import app
+from timeline import build_timelines
+
+with app.app_context():
+    # Jalankan berkala (mis. cron tiap jam) untuk memperbarui feed "Untukmu" semua user
+    started = time.perf_counter()
+    users, entries = build_timelines()
+    print(f"✅ Timeline {users} user diperbarui ({entries} entri, {time.perf_counter() - started:.1f} detik)")
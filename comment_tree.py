@@ -0,0 +1,33 @@
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db, Comment, CommentLike
+
+def load_comment_tree(story_id, viewer_id=None):
+    # Seluruh komentar + author dalam satu query (JOIN users)
+    comments = Comment.query.options(db.joinedload(Comment.author)).filter_by(
+        story_id=story_id
+    ).order_by(Comment.created_at.asc(), Comment.id.asc()).all()
+
+    # Komentar yang disukai viewer, satu query untuk semua node
+    liked_ids = set()
+    if viewer_id and comments:
+        rows = db.session.query(CommentLike.comment_id).join(Comment).filter(
+            Comment.story_id == story_id,
+            CommentLike.user_id == viewer_id
+        ).all()
+        liked_ids = {row.comment_id for row in rows}
+
+    # Susun pohon di memori. Relasi replies diisi langsung (set_committed_value)
+    # supaya template tidak memicu lazy load per node.
+    children = {comment.id: [] for comment in comments}
+    roots = []
+    for comment in comments:
+        comment.user_has_liked = comment.id in liked_ids
+        if comment.parent_id in children:
+            children[comment.parent_id].append(comment)
+        else:
+            roots.append(comment)
+
+    for comment in comments:
+        set_committed_value(comment, 'replies', children[comment.id])
+
+    return roots
@@ -4,14 +4,119 @@ from datetime import datetime, timezone, timedelta
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'curhatin.db')
+    # Database dari env (mis. postgresql://...), default file SQLite lokal
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'curhatin.db'))
+    # Replica opsional untuk route @read_only (database.py); kosong = semua ke primary
+    DATABASE_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    DATABASE_REPLICA_LAG = 5  # detik baca dari primary setelah user menulis
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Profil pool koneksi (database.py), pilih lewat env CURHATIN_DB_PROFILE
+    DATABASE_PROFILE = os.environ.get('CURHATIN_DB_PROFILE', 'development')
+    DATABASE_POOL_PROFILES = {
+        'development': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 30},
+        'production': {'pool_size': 20, 'max_overflow': 10, 'pool_timeout': 10, 'pool_pre_ping': True},
+    }
+    
+    # PRAGMA SQLite yang dipasang di setiap koneksi (database.py)
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = 5000  # ms
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB = 64 * 1024
+    
     SECRET_KEY = 'your-secret-key-here'
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB
     UPLOAD_FOLDER = 'static/uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    
+    # Pemrosesan gambar di process pool (images.py); format tambahan selain JPEG/PNG,
+    # mis. 'AVIF' jika plugin pillow-avif terpasang
+    IMAGE_PROCESSING_ASYNC = True
+    IMAGE_WORKERS = 2
+    IMAGE_VARIANT_WIDTHS = {'thumb': 320, 'card': 640, 'full': 1280}
+    IMAGE_EXTRA_FORMATS = ['WEBP']
+    
+    # CSS/JS di-fingerprint ke static/dist/ (assets.py); asset ber-hash di-cache 1 tahun
+    ASSET_FINGERPRINT = True
+    ASSET_MAX_AGE = 365 * 24 * 3600
+    
+    # Cache HTML story card/komentar (fragment_cache.py), jumlah entry maksimum; 0 = mati
+    FRAGMENT_CACHE_SIZE = 5000
+    
+    # Cache response utuh untuk pengunjung anonim (response_cache.py); 0 = mati
+    RESPONSE_CACHE_SIZE = 500
+    RESPONSE_CACHE_TTL = 10  # detik
+    RESPONSE_CACHE_STALE = 60  # detik tambahan, dilayani basi sambil dirender ulang
+    
+    # API v2 (api_v2.py): ukuran halaman default dan batas ?limit=
+    API_PAGE_SIZE = 6
+    API_COMMENTS_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 50
+    
+    # Feed "Untukmu" (timeline.py), dibangun berkala oleh build_timelines.py
+    FOR_YOU_CANDIDATE_DAYS = 30
+    FOR_YOU_CANDIDATES = 3000  # story kandidat; matriks kemiripan berukuran kandidat^2
+    FOR_YOU_TIMELINE_SIZE = 200  # entri per user
+    FOR_YOU_HALF_LIFE_HOURS = 72  # skor story berkurang separuh setiap rentang ini
+    FOR_YOU_USER_BATCH = 1024
+    FOR_YOU_WEIGHTS = {'story_like': 1.0, 'comment': 2.0, 'comment_like': 0.5}
+    
+    # Ranking curhatan populer: 'top' (jumlah like) atau 'hot' (like + peluruhan waktu)
+    POPULAR_RANKING = 'top'
+    POPULAR_HOT_DECAY_SECONDS = 45000
+    
+    # Pencarian full-text (FTS5): ikut cari di komentar, dengan bobot relevansi lebih rendah
+    SEARCH_INCLUDE_COMMENTS = True
+    SEARCH_COMMENT_WEIGHT = 0.5
+    
+    # Notifikasi diproses worker thread di luar request (False = insert di commit yang sama)
+    NOTIFICATION_ASYNC = True
+    NOTIFICATION_BATCH_SIZE = 200
+    NOTIFICATION_BATCH_WINDOW = 0.05  # detik
+    NOTIFICATIONS_PER_PAGE = 20
+    
+    # Toggle like dikumpulkan lalu ditulis per batch oleh worker thread (like_buffer.py)
+    LIKE_BUFFER_ASYNC = True
+    LIKE_BATCH_SIZE = 500
+    LIKE_BATCH_WINDOW = 0.005  # detik
+    LIKE_BUFFER_TIMEOUT = 5  # detik maksimum request menunggu batch-nya
+    
+    # Push real-time lewat SSE (realtime.py); broker Redis dibutuhkan jika lebih dari satu proses
+    REALTIME_BROKER_URL = os.environ.get('REALTIME_BROKER_URL')
+    REALTIME_HEARTBEAT = 15  # detik antar ping ke client
+    REALTIME_MAX_STREAM = 60  # detik sebelum koneksi ditutup dan disambung ulang browser
+    # Koneksi SSE terbuka per proses; selebihnya dijawab 503 dan browser kembali ke polling.
+    # Di server threaded/gunicorn sync tiap koneksi memegang satu thread, jadi jaga di bawah
+    # jumlah thread; naikkan (mis. 1000) hanya dengan worker gevent
+    REALTIME_MAX_CONNECTIONS = int(os.environ.get('REALTIME_MAX_CONNECTIONS', 20))
+    REALTIME_RETRY = 5  # detik jeda reconnect EventSource
+    REALTIME_QUEUE_SIZE = 100  # event tertunda per koneksi
+    REALTIME_MAX_STORIES = 100  # story yang boleh diikuti satu koneksi
+    
+    # Instrumentasi request (instrumentation.py): histogram latency, jumlah query, /metrics
+    INSTRUMENTATION_ENABLED = True
+    SLOW_QUERY_SECONDS = 0.1  # query selama ini atau lebih dicatat di log beserta pemanggilnya
+    QUERY_BUDGET = 30  # maksimum query per request; None = tanpa batas
+    QUERY_BUDGETS = {  # batas per endpoint, menimpa QUERY_BUDGET
+        'index': 10,
+        'story_detail': 12,
+        'search_stories': 10,
+        'api_stories': 8,
+        'profile': 10,
+        'notifications': 10,
+        'like_story': 8,
+        'like_comment': 8,
+    }
+    QUERY_BUDGET_ACTION = os.environ.get('QUERY_BUDGET_ACTION', 'log')  # 'log' atau 'raise' (dev/test)
+    QUERY_DEBUG_HEADER = os.environ.get('QUERY_DEBUG_HEADER') == '1'  # X-Query-Count + Server-Timing
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # /metrics butuh "Authorization: Bearer <token>"; kosong = hanya localhost
+    
+    # Retensi (prune_notifications.py): notifikasi yang sudah dibaca
+    NOTIFICATION_RETENTION_DAYS = 90
+    NOTIFICATION_MAX_PER_USER = 500
 
 def get_indonesia_time():
     return datetime.now(timezone(timedelta(hours=7)))
\ No newline at end of file
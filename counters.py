@@ -0,0 +1,84 @@
+from models import db, User, UserStats, Story, Comment, StoryLike, CommentLike
+
+# Semua perubahan counter memakai ekspresi SQL (kolom = kolom + delta) supaya
+# aman dari race antar request dan ikut commit yang sama dengan perubahan datanya.
+
+def bump_story_likes(story, delta):
+    story.like_count = Story.like_count + delta
+
+def bump_story_comments(story, delta):
+    story.comment_count = Story.comment_count + delta
+
+def bump_comment_likes(comment, delta):
+    comment.like_count = Comment.like_count + delta
+
+def bump_comment_replies(comment, delta):
+    comment.reply_count = Comment.reply_count + delta
+
+def bump_user_stats(user_id, **deltas):
+    deltas = {getattr(UserStats, name): getattr(UserStats, name) + delta
+              for name, delta in deltas.items() if delta}
+    if deltas:
+        db.session.query(UserStats).filter(UserStats.user_id == user_id).update(
+            deltas, synchronize_session=False)
+
+def bump_comments_written(comment_ids, sign=1):
+    # Per penulis, untuk komentar yang dibuat/terhapus sekaligus (mis. satu subtree)
+    rows = db.session.query(Comment.user_id, db.func.count(Comment.id)).filter(
+        Comment.id.in_(comment_ids)).group_by(Comment.user_id).all()
+    for user_id, count in rows:
+        bump_user_stats(user_id, comments_written=sign * count)
+
+def comment_subtree_ids(comment):
+    # Komentar yang ikut terhapus: komentar itu sendiri + semua balasan di bawahnya
+    ids = [comment.id]
+    frontier = [comment.id]
+    while frontier:
+        rows = db.session.query(Comment.id).filter(Comment.parent_id.in_(frontier)).all()
+        frontier = [row.id for row in rows]
+        ids.extend(frontier)
+    return ids
+
+def reconcile_counters():
+    # Hitung ulang semua counter dari tabel sumbernya (backfill / perbaikan drift)
+    story_likes = db.select(db.func.count(StoryLike.id)).where(
+        StoryLike.story_id == Story.id).scalar_subquery()
+    story_comments = db.select(db.func.count(Comment.id)).where(
+        Comment.story_id == Story.id).scalar_subquery()
+    db.session.execute(db.update(Story).values(like_count=story_likes, comment_count=story_comments))
+
+    replies = db.aliased(Comment)
+    comment_likes = db.select(db.func.count(CommentLike.id)).where(
+        CommentLike.comment_id == Comment.id).scalar_subquery()
+    comment_replies = db.select(db.func.count(replies.id)).where(
+        replies.parent_id == Comment.id).scalar_subquery()
+    db.session.execute(db.update(Comment).values(like_count=comment_likes, reply_count=comment_replies))
+
+    db.session.commit()
+
+def reconcile_user_stats(user_ids=None):
+    # Hitung ulang statistik profil dari tabel sumbernya; baris yang belum ada ikut dibuat
+    stories = db.select(db.func.count(Story.id)).where(Story.user_id == User.id).scalar_subquery()
+    likes_received = db.select(db.func.count(StoryLike.id)).join(Story, StoryLike.story_id == Story.id).where(
+        Story.user_id == User.id).scalar_subquery()
+    comments_written = db.select(db.func.count(Comment.id)).where(Comment.user_id == User.id).scalar_subquery()
+    comments_received = db.select(db.func.count(Comment.id)).join(Story, Comment.story_id == Story.id).where(
+        Story.user_id == User.id).scalar_subquery()
+
+    query = db.session.query(User.id, stories, likes_received, comments_written, comments_received)
+    stale = db.session.query(UserStats)
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+        stale = stale.filter(UserStats.user_id.in_(user_ids))
+    rows = [{
+        'user_id': user_id,
+        'stories_count': story_count,
+        'likes_received': like_count,
+        'comments_written': written_count,
+        'comments_received': received_count,
+    } for user_id, story_count, like_count, written_count, received_count in query.all()]
+
+    stale.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(UserStats), rows)
+    db.session.commit()
@@ -1,6 +1,12 @@
 from app import app, db
 from models import User, Story, Comment, StoryLike, CommentLike, Notification
 from werkzeug.security import generate_password_hash
+from counters import reconcile_counters, reconcile_user_stats
+from ranking import rebuild_rankings
+from timeline import build_timelines
+from notifications import reconcile_unread_counts
+from search_index import drop_search_index, rebuild_search_index
+from migrations import upgrade
 from datetime import datetime, timedelta, timezone
 import random
 
@@ -10,8 +16,9 @@ def get_indonesia_time():
 def create_dummy_data():
     with app.app_context():
         print("🗑️ Menghapus data lama...")
+        drop_search_index()
         db.drop_all()
-        db.create_all()
+        upgrade()
         
         print("👥 Membuat user dummy...")
         # Create dummy users
@@ -215,6 +222,14 @@ def create_dummy_data():
         
         db.session.commit()
         
+        print("🔢 Menghitung counter like/komentar...")
+        reconcile_counters()
+        rebuild_rankings()
+        reconcile_unread_counts()
+        reconcile_user_stats()
+        rebuild_search_index()
+        build_timelines()
+        
         print("🎉 Dummy data berhasil dibuat!")
         print("\n📊 Statistik Data:")
         print(f"   👥 Users: {User.query.count()}")
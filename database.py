@@ -0,0 +1,103 @@
+import time
+from functools import partial, wraps
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Setup engine database: profil pool koneksi per deployment, PRAGMA SQLite
+# yang dipasang di setiap koneksi baru, dan routing baca ke replica.
+#
+# Mode WAL membuat pembaca tidak diblokir penulis (toggle like, commit worker
+# notifikasi), synchronous=NORMAL aman di WAL dan jauh lebih murah daripada
+# FULL, dan busy_timeout membuat penulis menunggu giliran alih-alih langsung
+# gagal dengan "database is locked".
+#
+# Replica (DATABASE_REPLICA_URL) hanya dipakai route yang ditandai @read_only.
+# Flush/commit selalu ke primary. Setelah user menulis, route read_only
+# memakai primary selama DATABASE_REPLICA_LAG detik (penanda di session) agar
+# user langsung melihat curhatan/like/komentarnya sendiri.
+
+REPLICA_BIND = 'replica'
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Hanya SELECT; flush dan INSERT/UPDATE/DELETE langsung tetap ke primary.
+        # Tanpa clause (session.connection(), bulk insert ORM) juga dianggap tulis.
+        is_write = self._flushing or clause is None or getattr(clause, 'is_dml', False)
+        if bind is None and not is_write and has_request_context() and g.get('use_replica'):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _mark_write(session, flush_context):
+    session.info['wrote'] = True
+
+def prefer_primary():
+    # Read-your-writes: request berikutnya dari user ini dibaca dari primary
+    if current_app.config['DATABASE_REPLICA_URI']:
+        flask_session['db_primary_until'] = time.time() + current_app.config['DATABASE_REPLICA_LAG']
+
+def _remember_write(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        prefer_primary()
+
+def _forget_write(session, previous_transaction):
+    session.info.pop('wrote', None)
+
+def replica_allowed():
+    # False selama masa read-your-writes setelah user ini menulis
+    return flask_session.get('db_primary_until', 0) < time.time()
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = replica_allowed()
+        return view(*args, **kwargs)
+    return wrapper
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def pool_options(config, uri):
+    # SQLite in-memory memakai StaticPool (satu koneksi), opsi pool tidak berlaku
+    if is_memory_sqlite(uri):
+        return {}
+    return dict(config['DATABASE_POOL_PROFILES'][config['DATABASE_PROFILE']])
+
+def apply_sqlite_pragmas(config, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+        cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+        cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+        # Nilai negatif = ukuran dalam KiB, bukan jumlah halaman
+        cursor.execute(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+def init_app(app, db):
+    # Dipanggil sebagai pengganti db.init_app(app)
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for key, value in pool_options(app.config, app.config['SQLALCHEMY_DATABASE_URI']).items():
+        options.setdefault(key, value)
+
+    replica_uri = app.config['DATABASE_REPLICA_URI']
+    if replica_uri:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND, {'url': replica_uri, **pool_options(app.config, replica_uri)})
+
+    db.init_app(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', partial(apply_sqlite_pragmas, app.config))
+
+    event.listen(RoutingSession, 'after_flush', _mark_write)
+    event.listen(RoutingSession, 'after_commit', _remember_write)
+    event.listen(RoutingSession, 'after_soft_rollback', _forget_write)
@@ -0,0 +1,89 @@
+from models import db, User, Story, UserTimeline
+from ranking import popular_sort_column
+from pagination import keyset_page
+
+# Query feed (index, pencarian, /api/stories, profil): SELECT hanya kolom yang
+# dipakai kartu + nama author lewat JOIN, counter diambil dari kolom yang sudah
+# dijaga counters.py. Hasilnya StoryCard (objek ber-__slots__), bukan entity
+# ORM: tidak masuk identity map, tidak ada lazy load story.author per kartu.
+
+CARD_COLUMNS = (
+    Story.id, Story.content, Story.is_anonymous, Story.image_url, Story.image_variants,
+    Story.created_at, Story.updated_at, Story.user_id, Story.like_count, Story.comment_count,
+    User.username.label('author_name'),
+)
+
+class StoryCard:
+    __slots__ = ('id', 'content', 'is_anonymous', 'image_url', 'image_variants', 'created_at',
+                 'updated_at', 'user_id', 'like_count', 'comment_count', 'author_name', 'user_has_liked')
+
+    def __init__(self, id, content, is_anonymous, image_url, image_variants, created_at,
+                 updated_at, user_id, like_count, comment_count, author_name, *sort_keys):
+        self.id = id
+        self.content = content
+        self.is_anonymous = is_anonymous
+        self.image_url = image_url
+        self.image_variants = image_variants
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.user_id = user_id
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.author_name = author_name
+        self.user_has_liked = False
+
+def card_select(*extra_columns):
+    # Versi Core tanpa Query ORM (api_v2.py)
+    return db.select(*CARD_COLUMNS, *extra_columns).join(User, User.id == Story.user_id)
+
+def card_query(*extra_columns, content=None):
+    columns = list(CARD_COLUMNS + extra_columns)
+    if content is not None:
+        columns[1] = content
+    return db.session.query(*columns).join(User, User.id == Story.user_id)
+
+def to_cards(rows):
+    return [StoryCard(*row) for row in rows]
+
+def _card_page(sort_columns, limit, cursor, query=None):
+    if query is None:
+        # Kolom urutan ikut di-SELECT untuk membuat cursor (mis. hot_score)
+        card_keys = {column.key for column in CARD_COLUMNS}
+        query = card_query(*[column for column in sort_columns if column.key not in card_keys])
+    page = keyset_page(query, sort_columns, limit, cursor)
+    page.items = to_cards(page.items)
+    return page
+
+def latest_cards(limit, cursor=None):
+    # Keyset atas (created_at, id), lihat pagination.py
+    return _card_page([Story.created_at, Story.id], limit, cursor)
+
+def popular_cards(limit, cursor=None):
+    # Keyset atas (score, id); score = like_count atau hot_score (ranking.py)
+    return _card_page([popular_sort_column(), Story.id], limit, cursor)
+
+def for_you_cards(user_id, limit, cursor=None):
+    # Timeline yang sudah dihitung build_timelines.py, keyset atas (score, story_id)
+    query = card_query(UserTimeline.score, UserTimeline.story_id).join(
+        UserTimeline, UserTimeline.story_id == Story.id).filter(UserTimeline.user_id == user_id)
+    return _card_page([UserTimeline.score, UserTimeline.story_id], limit, cursor, query)
+
+def cards_by_ids(story_ids):
+    # Urutan mengikuti story_ids (mis. hasil ranking pencarian)
+    cards = {card.id: card for card in to_cards(card_query().filter(Story.id.in_(story_ids)))}
+    return [cards[story_id] for story_id in story_ids if story_id in cards]
+
+def paginate_cards(query, page, per_page):
+    # Mode ?page=N (tanpa cursor) tetap lewat Pagination Flask-SQLAlchemy
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination.items = to_cards(pagination.items)
+    return pagination
+
+def user_cards(user_id, limit, preview_chars=None):
+    # Profil hanya menampilkan cuplikan isi, jadi teks panjang tidak ikut dibaca
+    content = None
+    if preview_chars:
+        content = db.func.substr(Story.content, 1, preview_chars + 1).label('content')
+    rows = card_query(content=content).filter(Story.user_id == user_id).order_by(
+        Story.created_at.desc(), Story.id.desc()).limit(limit)
+    return to_cards(rows)
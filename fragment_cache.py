@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from flask_login import current_user
+from markupsafe import Markup
+
+# Cache HTML hasil render components/story_card.html dan components/comment.html.
+# Bagian yang sama untuk semua viewer (isi, author, waktu, gambar, counter)
+# dirender sekali per versi entity dan disimpan di LRU berukuran tetap; bagian
+# per-viewer (tombol hapus milik sendiri, status like) dan balasan komentar
+# diisi lewat placeholder setiap request. Placeholder berbentuk komentar HTML
+# sehingga tidak mungkin muncul dari konten user (selalu di-escape).
+#
+# Key memuat versi entity (Story.updated_at, counter), jadi worker lain yang
+# masih punya entry lama otomatis miss. invalidate() di route hanya membuang
+# entry basi dari memori worker ini.
+
+OWNER_SLOT = Markup('<!--slot:owner-->')
+LIKED_SLOT = Markup('<!--slot:liked-->')
+REPLIES_SLOT = Markup('<!--slot:replies-->')
+SLOTS = {'owner': OWNER_SLOT, 'liked': LIKED_SLOT, 'replies': REPLIES_SLOT}
+
+class FragmentCache:
+    def __init__(self, app=None):
+        self.app = None
+        self.max_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_entity = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_entries = app.config['FRAGMENT_CACHE_SIZE']
+        app.extensions['fragment_cache'] = self
+        app.add_template_global(render_story_card)
+        app.add_template_global(render_comment)
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def set(self, key, html):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            # key[:2] = (jenis, id) untuk invalidate per entity
+            self._keys_by_entity.setdefault(key[:2], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+
+    def _forget(self, key):
+        keys = self._keys_by_entity.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_entity[key[:2]]
+
+    def invalidate(self, kind, *entity_ids):
+        with self._lock:
+            for entity_id in entity_ids:
+                for key in self._keys_by_entity.pop((kind, entity_id), ()):
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_entity.clear()
+
+cache = FragmentCache()
+
+def _render_cached(key, template_name, **context):
+    html = cache.get(key)
+    if html is None:
+        # Render tanpa context processor/current_user: fragment tidak boleh bergantung viewer
+        html = current_app.jinja_env.get_template(template_name).render(slots=SLOTS, **context)
+        cache.set(key, html)
+    return html
+
+def _apply_viewer(html, kind, entity, owner_template):
+    if current_user.is_authenticated and current_user.id == entity.user_id:
+        owner_html = _render_cached((kind, entity.id, 'owner'), owner_template, **{kind: entity})
+    else:
+        owner_html = ''
+    liked = 'liked' if getattr(entity, 'user_has_liked', False) else ''
+    return html.replace(OWNER_SLOT, owner_html).replace(LIKED_SLOT, liked)
+
+def render_story_card(story):
+    authenticated = current_user.is_authenticated
+    key = ('story', story.id, story.updated_at, story.like_count, story.comment_count,
+           story.image_variants is not None, authenticated)
+    html = _render_cached(key, 'components/story_card_body.html', story=story, authenticated=authenticated)
+    return Markup(_apply_viewer(html, 'story', story, 'components/story_owner_actions.html'))
+
+def render_comment(comment, depth=0):
+    # Komentar tidak bisa diedit, jadi versinya cukup dari counter
+    authenticated = current_user.is_authenticated
+    has_replies = bool(comment.replies)
+    key = ('comment', comment.id, comment.like_count, depth > 0, has_replies, authenticated)
+    html = _render_cached(key, 'components/comment_body.html', comment=comment, depth=depth,
+                          has_replies=has_replies, authenticated=authenticated)
+    html = _apply_viewer(html, 'comment', comment, 'components/comment_owner_actions.html')
+    if has_replies:
+        replies = ''.join(render_comment(reply, depth + 1) for reply in comment.replies)
+        html = html.replace(REPLIES_SLOT, replies)
+    return Markup(html)
@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import random
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+from werkzeug.security import generate_password_hash
+from app import app
+from models import db, User, Story, Comment, StoryLike, CommentLike
+from config import get_indonesia_time
+from counters import reconcile_counters, reconcile_user_stats
+from ranking import rebuild_rankings
+from timeline import build_timelines
+from notifications import reconcile_unread_counts
+from search_index import drop_search_index, rebuild_search_index
+from migrations import upgrade
+
+# Data skala produksi untuk benchmark.py: insert massal per chunk (executemany),
+# bukan satu objek ORM per baris. Aktivitas user dan popularitas story mengikuti
+# distribusi Zipf (--skew), jadi segelintir story viral menerima sebagian besar
+# like/komentar seperti di produksi. Counter, ranking, statistik profil dan index
+# pencarian dihitung sekali di akhir.
+#
+#   python generate_bulk_data.py --users 20000 --stories 1000000 --likes 5000000
+
+CHUNK_SIZE = 10000
+
+OPENINGS = [
+    'Hari ini aku', 'Jujur aku', 'Akhir-akhir ini aku', 'Tadi pagi aku', 'Semalam aku',
+    'Entah kenapa aku', 'Sudah seminggu aku', 'Baru saja aku',
+]
+FEELINGS = [
+    'merasa sangat bersyukur', 'sedih banget', 'lagi stres sama pekerjaan', 'kangen masa kecil',
+    'galau mikirin masa depan', 'bahagia banget', 'merasa kesepian', 'kecewa sama teman dekat',
+    'capek sama kuliah', 'deg-degan mau sidang', 'lagi jatuh cinta', 'bingung harus cerita ke siapa',
+]
+CLOSINGS = [
+    'Semoga besok lebih baik.', 'Butuh waktu untuk healing...', 'Ada yang pernah ngerasain juga?',
+    'Terima kasih sudah mau baca.', 'Hidup memang penuh kejutan.', 'Pengen cepat selesai semuanya.',
+]
+REPLIES = [
+    'Semangat ya!', 'Aku juga pernah ngalamin ini.', 'Peluk jauh dari sini.', 'Kamu nggak sendirian.',
+    'Cerita aja kalau butuh teman ngobrol.', 'Ikut senang dengarnya!', 'Sabar ya, pasti ada jalannya.',
+]
+
+def zipf_cumulative(count, exponent):
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+class SkewedPicker:
+    # Id diacak dulu supaya yang populer tidak selalu id terkecil
+    def __init__(self, ids, exponent, rng):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cumulative = zipf_cumulative(len(self.ids), exponent)
+        self.total = self.cumulative[-1]
+        self.rng = rng
+
+    def pick(self):
+        return self.ids[bisect_left(self.cumulative, self.rng.random() * self.total)]
+
+def _chunks(rows):
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, CHUNK_SIZE)):
+        yield chunk
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+def bulk_insert(model, rows, total, label, ignore_conflicts=False):
+    if ignore_conflicts:
+        # Pasangan like duplikat dari sampling dilewati oleh unique index
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(model.__table__).on_conflict_do_nothing()
+    else:
+        # Insert Core langsung ke tabel, tanpa overhead unit-of-work ORM
+        statement = db.insert(model.__table__)
+
+    started = time.perf_counter()
+    done = 0
+    for chunk in _chunks(rows):
+        db.session.execute(statement, chunk)
+        db.session.commit()
+        done += len(chunk)
+        print(f"\r   {label}: {done:,}/{total:,}", end='', flush=True)
+    print(f"\r✅ {label}: {done:,} baris ({time.perf_counter() - started:.1f} detik)")
+
+def generate(args):
+    rng = random.Random(args.seed)
+    now = get_indonesia_time()
+    start = now - timedelta(days=args.days)
+    password = generate_password_hash('password123')
+
+    first_user = _next_id(User)
+    user_ids = range(first_user, first_user + args.users)
+    bulk_insert(User, ({
+        'id': user_id,
+        'username': f'user{user_id}',
+        'email': f'user{user_id}@example.com',
+        'password': password,
+        'created_at': start - timedelta(days=rng.randint(0, 365)),
+    } for user_id in user_ids), args.users, 'Users')
+    authors = SkewedPicker(user_ids, args.skew, rng)
+
+    # Story diposting merata sepanjang --days, urut sesuai id
+    first_story = _next_id(Story)
+    story_ids = range(first_story, first_story + args.stories)
+    story_interval = args.days * 86400 / max(args.stories, 1)
+
+    def story_time(story_id):
+        return start + timedelta(seconds=(story_id - first_story) * story_interval)
+
+    bulk_insert(Story, ({
+        'id': story_id,
+        'content': f"{rng.choice(OPENINGS)} {rng.choice(FEELINGS)}. {rng.choice(CLOSINGS)}",
+        'is_anonymous': rng.random() < 0.2,
+        'created_at': story_time(story_id),
+        'user_id': authors.pick(),
+    } for story_id in story_ids), args.stories, 'Stories')
+    popular = SkewedPicker(story_ids, args.skew, rng)
+
+    # Komentar: sebagian membalas komentar sebelumnya di story yang sama
+    first_comment = _next_id(Comment)
+    comment_story = array('q')
+
+    def comment_rows():
+        for offset in range(args.comments):
+            parent_id = None
+            if offset and rng.random() < args.reply_ratio:
+                parent_offset = rng.randrange(offset)
+                parent_id = first_comment + parent_offset
+                story_id = comment_story[parent_offset]
+            else:
+                story_id = popular.pick()
+            comment_story.append(story_id)
+            # Komentar menyusul story hingga 7 hari kemudian, tapi tidak melewati waktu sekarang
+            created_at = min(story_time(story_id) + timedelta(minutes=rng.randint(1, 7 * 24 * 60)), now)
+            yield {
+                'id': first_comment + offset,
+                'content': rng.choice(REPLIES),
+                'created_at': created_at,
+                'user_id': authors.pick(),
+                'story_id': story_id,
+                'parent_id': parent_id,
+            }
+
+    bulk_insert(Comment, comment_rows(), args.comments, 'Comments')
+
+    bulk_insert(StoryLike, ({
+        'user_id': authors.pick(),
+        'story_id': popular.pick(),
+        'created_at': now,
+    } for _ in range(args.likes)), args.likes, 'Story likes', ignore_conflicts=True)
+
+    if args.comments:
+        comment_ids = range(first_comment, first_comment + args.comments)
+        popular_comments = SkewedPicker(comment_ids, args.skew, rng)
+        bulk_insert(CommentLike, ({
+            'user_id': authors.pick(),
+            'comment_id': popular_comments.pick(),
+            'created_at': now,
+        } for _ in range(args.comment_likes)), args.comment_likes, 'Comment likes', ignore_conflicts=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Buat data dummy skala besar untuk benchmark')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--stories', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=30000)
+    parser.add_argument('--likes', type=int, default=100000)
+    parser.add_argument('--comment-likes', type=int, default=30000)
+    parser.add_argument('--reply-ratio', type=float, default=0.3, help='porsi komentar yang berupa balasan')
+    parser.add_argument('--skew', type=float, default=1.1, help='eksponen Zipf; makin besar makin timpang')
+    parser.add_argument('--days', type=int, default=365, help='rentang waktu posting')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='hapus semua data lama dulu')
+    args = parser.parse_args()
+
+    with app.app_context():
+        # Trigger FTS dilepas selama insert massal, index dibangun ulang sekali di akhir
+        drop_search_index()
+        if args.reset:
+            print("🗑️ Menghapus data lama...")
+            db.drop_all()
+        upgrade()
+
+        generate(args)
+
+        print("🔢 Menghitung counter, ranking, statistik, index pencarian dan timeline...")
+        reconcile_counters()
+        rebuild_rankings()
+        reconcile_unread_counts()
+        reconcile_user_stats()
+        rebuild_search_index()
+        build_timelines()
+        print("🎉 Data bulk berhasil dibuat! Login: user<id> / password123")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import os
+from PIL import Image, ImageOps
+
+# Fungsi di modul ini dijalankan di process pool (lihat images.py), jadi sengaja
+# tidak meng-import Flask/app/models: cukup Pillow dan path file.
+
+def _fallback_format(image):
+    return 'PNG' if image.mode in ('RGBA', 'LA', 'P') else 'JPEG'
+
+def process_image(raw_path, output_dir, base_name, widths, extra_formats):
+    with Image.open(raw_path) as source:
+        if getattr(source, 'is_animated', False):
+            # GIF animasi tidak di-resize supaya animasinya tidak hilang; {} = hanya file asli
+            return {}
+
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+        fallback_format = _fallback_format(image)
+        if fallback_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        os.makedirs(output_dir, exist_ok=True)
+        variants = {}
+        previous_width = None
+        for name, width in widths.items():
+            width = min(width, image.width)
+            # Variant yang ukurannya sama dengan sebelumnya tidak dibuat ulang
+            if width == previous_width:
+                variants[name] = dict(variants[list(variants)[-1]])
+                continue
+            previous_width = width
+
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+
+            files = {}
+            for image_format in [fallback_format] + list(extra_formats):
+                extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+                filename = f'{base_name}_{name}.{extension}'
+                options = {'optimize': True} if image_format in ('JPEG', 'PNG') else {}
+                if image_format in ('JPEG', 'WEBP', 'AVIF'):
+                    options['quality'] = 85 if image_format == 'JPEG' else 80
+                resized.save(os.path.join(output_dir, filename), image_format, **options)
+                files[extension] = filename
+
+            variants[name] = {'width': width, 'height': height, 'files': files}
+        return variants
@@ -0,0 +1,192 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from flask import current_app
+from PIL import Image, UnidentifiedImageError
+from image_worker import process_image
+from models import db, Story, UploadBlob
+from config import get_indonesia_time
+from fragment_cache import cache as fragment_cache
+from response_cache import cache as response_cache, FEED
+
+# Upload disimpan mentah dulu (request langsung selesai), lalu resize + encode
+# variant thumb/card/full (JPEG/PNG + WebP) dikerjakan process pool karena Pillow
+# CPU-bound. Hasilnya dicatat di Story.image_variants untuk srcset di template.
+#
+# Penyimpanan content-addressed: nama file = sha256 isinya
+# (uploads/ab/abcdef....jpg), jadi upload identik hanya disimpan sekali dan
+# direferensikan lewat UploadBlob.ref_count. File baru dihapus saat tidak ada
+# story yang memakainya lagi. Isi file di satu URL tidak pernah berubah, jadi
+# aman di-cache selamanya.
+#
+# variants None = belum diproses (process_images.py mencoba lagi), {} = selesai
+# tanpa variant (GIF animasi), template memakai file aslinya.
+
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+_executor = None
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def upload_folder():
+    return os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+
+def static_path(relative_url):
+    return os.path.join(current_app.root_path, 'static', relative_url)
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(data)
+    os.replace(tmp_path, path)
+
+def _upsert_blob(digest, path, size):
+    # Insert blob baru atau tambah ref_count jika hash sudah ada, dalam satu statement
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(UploadBlob).values(
+        hash=digest, path=path, size=size, ref_count=1, created_at=get_indonesia_time()
+    ).on_conflict_do_update(
+        index_elements=['hash'], set_={'ref_count': UploadBlob.ref_count + 1}
+    )
+    db.session.execute(statement)
+    return db.session.get(UploadBlob, digest, populate_existing=True)
+
+def store_blob(data):
+    # Cek header saja (tanpa decode pixel) supaya file bukan-gambar ditolak
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return None
+    if image_format not in IMAGE_EXTENSIONS:
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()
+    folder = os.path.relpath(upload_folder(), os.path.join(current_app.root_path, 'static'))
+    path = f'{folder}/{digest[:2]}/{digest}.{IMAGE_EXTENSIONS[image_format]}'.replace(os.sep, '/')
+    if not os.path.exists(static_path(path)):
+        _write_atomic(static_path(path), data)
+
+    # Referensi ikut transaksi route; commit dilakukan bersama story
+    return _upsert_blob(digest, path, len(data))
+
+def save_upload(file):
+    if not (file and allowed_file(file.filename)):
+        return None
+    data = file.read(current_app.config['MAX_CONTENT_LENGTH'] + 1)
+    return store_blob(data)
+
+def release_upload(image_url):
+    # Lepas satu referensi; kembalikan blob yang sudah tidak dipakai untuk dihapus setelah commit
+    if not image_url:
+        return None
+    blob = UploadBlob.query.filter_by(path=image_url).first()
+    if blob is None:
+        return None
+    blob.ref_count = UploadBlob.ref_count - 1
+    db.session.flush()
+    if blob.ref_count > 0:
+        return None
+    orphan = (blob.hash, blob.path, blob.variants)
+    db.session.delete(blob)
+    return orphan
+
+def purge_orphan(orphan):
+    if orphan is None:
+        return
+    digest, path, variants = orphan
+    # Bisa saja hash yang sama baru di-upload lagi sejak commit tadi
+    if db.session.get(UploadBlob, digest) is not None:
+        return
+    delete_image_files(path, variants)
+
+def get_executor(app):
+    global _executor
+    if _executor is None:
+        # spawn: aman dipakai dari server multi-thread (fork bisa deadlock)
+        _executor = ProcessPoolExecutor(
+            max_workers=app.config['IMAGE_WORKERS'],
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+def schedule_image_processing(blob):
+    # Blob yang sudah pernah diproses (upload ulang file yang sama) tidak diproses lagi
+    if blob.variants is not None:
+        return
+    app = current_app._get_current_object()
+    args = (
+        static_path(blob.path),
+        os.path.dirname(static_path(blob.path)),
+        blob.hash,
+        app.config['IMAGE_VARIANT_WIDTHS'],
+        app.config['IMAGE_EXTRA_FORMATS'],
+    )
+
+    if not app.config['IMAGE_PROCESSING_ASYNC']:
+        record_variants(blob.hash, blob.path, process_image(*args))
+        return
+
+    future = get_executor(app).submit(process_image, *args)
+    future.add_done_callback(partial(_on_processed, app, blob.hash, blob.path))
+
+def _on_processed(app, digest, path, future):
+    try:
+        variants = future.result()
+    except Exception:
+        app.logger.exception('Gagal memproses gambar %s', path)
+        return
+    with app.app_context():
+        record_variants(digest, path, variants)
+
+def record_variants(digest, path, variants):
+    if variants is None:
+        return
+    folder = path.rsplit('/', 1)[0]
+    image_variants = {}
+    for name, variant in variants.items():
+        image_variants[name] = {'width': variant['width'], 'height': variant['height']}
+        for extension, filename in variant['files'].items():
+            image_variants[name][extension] = f'{folder}/{filename}'
+
+    # Semua story yang memakai blob ini langsung mendapat variant-nya
+    updated = UploadBlob.query.filter_by(hash=digest).update(
+        {'variants': image_variants}, synchronize_session=False)
+    story_ids = [row.id for row in db.session.query(Story.id).filter_by(image_url=path)]
+    Story.query.filter_by(image_url=path).update(
+        {'image_variants': image_variants, 'updated_at': get_indonesia_time()}, synchronize_session=False)
+    db.session.commit()
+    fragment_cache.invalidate('story', *story_ids)
+    response_cache.invalidate(FEED, *(('story', story_id) for story_id in story_ids))
+    if not updated:
+        # Blob sudah dihapus selama diproses
+        delete_image_files(None, image_variants)
+
+def delete_image_files(image_url, image_variants=None):
+    paths = [image_url] if image_url else []
+    for variant in (image_variants or {}).values():
+        paths.extend(value for key, value in variant.items() if key not in ('width', 'height'))
+    for path in set(paths):
+        try:
+            if os.path.exists(static_path(path)):
+                os.remove(static_path(path))
+        except OSError:
+            pass
+
+def variant_url(story, name='card'):
+    # Versi gambar untuk klien JSON: variant jika sudah ada, jika belum file asli
+    variant = (story.image_variants or {}).get(name)
+    if variant:
+        return variant.get('jpg') or variant.get('png')
+    return story.image_url
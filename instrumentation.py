@@ -0,0 +1,263 @@
+import bisect
+import os
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.wrappers import Response
+
+# Instrumentasi per request: jumlah dan durasi query SQL (event cursor di
+# semua Engine, termasuk replica), latency
+# per endpoint sebagai histogram, log query lambat beserta baris kode
+# pemanggilnya, dan /metrics dalam format teks Prometheus.
+#
+# - Statistik query request aktif disimpan di ContextVar, jadi query worker
+#   thread (like buffer, notifikasi, refresh response cache) tidak ikut terhitung.
+# - QUERY_BUDGET / QUERY_BUDGETS membatasi jumlah query per endpoint; saat
+#   terlampaui dicatat di log ('log') atau request digagalkan ('raise') tepat
+#   di query yang melewati batas, sehingga traceback menunjuk sumber N+1.
+# - QUERY_DEBUG_HEADER memasang X-Query-Count dan Server-Timing di response.
+# - Angka di /metrics per proses; scrape setiap worker gunicorn sendiri-sendiri.
+#   Tanpa METRICS_TOKEN, /metrics hanya menjawab request langsung dari localhost.
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+THIS_FILE = os.path.abspath(__file__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+STATEMENT_LOG_LENGTH = 1000
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+request_stats = ContextVar('request_stats', default=None)
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+class RequestStats:
+    __slots__ = ('endpoint', 'budget', 'queries', 'query_seconds', 'over_budget', 'started', 'elapsed', 'recorded')
+
+    def __init__(self, endpoint, budget):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.over_budget = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.recorded = False
+
+def call_site():
+    # Frame terdalam yang berasal dari kode aplikasi (termasuk template Jinja)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith('<'):
+            # Kode hasil generate (wrapper SQLAlchemy, exec)
+            continue
+        filename = os.path.abspath(frame.filename)
+        if filename == THIS_FILE or not filename.startswith(APP_ROOT) or 'site-packages' in filename:
+            continue
+        return f'{os.path.relpath(filename, APP_ROOT)}:{frame.lineno} in {frame.name}'
+    return '?'
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.label_names, label_values)), value
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, description, label_names, buckets):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = tuple(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labels + (('le', _format_number(bound)),), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+class Instrumentation:
+    def __init__(self, app=None):
+        self.app = None
+        self.requests = Counter(
+            'curhatin_http_requests_total', 'Jumlah request per endpoint dan status',
+            ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'curhatin_http_request_duration_seconds', 'Latency request per endpoint',
+            ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.request_queries = Histogram(
+            'curhatin_db_queries_per_request', 'Jumlah query SQL per request',
+            ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.query_latency = Histogram(
+            'curhatin_db_query_duration_seconds', 'Durasi satu query SQL (endpoint "-" = di luar request)',
+            ('endpoint',), QUERY_LATENCY_BUCKETS)
+        self.slow_queries = Counter(
+            'curhatin_db_slow_queries_total', 'Query yang melewati SLOW_QUERY_SECONDS', ('endpoint',))
+        self.budget_exceeded = Counter(
+            'curhatin_query_budget_exceeded_total', 'Request yang melewati QUERY_BUDGET', ('endpoint',))
+        self.metrics = [self.requests, self.latency, self.request_queries, self.query_latency,
+                        self.slow_queries, self.budget_exceeded]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['instrumentation'] = self
+        if not app.config['INSTRUMENTATION_ENABLED']:
+            return
+        # Listener di kelas Engine: berlaku untuk primary dan replica
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def budget_for(self, endpoint):
+        config = self.app.config
+        return config['QUERY_BUDGETS'].get(endpoint, config['QUERY_BUDGET'])
+
+    def _start_request(self):
+        endpoint = request.endpoint or 'unmatched'
+        stats = RequestStats(endpoint, self.budget_for(endpoint))
+        g._request_stats = stats
+        request_stats.set(stats)
+
+    def _record(self, stats, status):
+        stats.elapsed = time.perf_counter() - stats.started
+        stats.recorded = True
+        self.requests.inc(stats.endpoint, request.method, str(status))
+        self.latency.observe(stats.elapsed, stats.endpoint, request.method)
+        self.request_queries.observe(stats.queries, stats.endpoint)
+
+    def _finish_request(self, response):
+        stats = g.get('_request_stats')
+        if stats is None:
+            return response
+        self._record(stats, response.status_code)
+        if self.app.config['QUERY_DEBUG_HEADER']:
+            response.headers['X-Query-Count'] = str(stats.queries)
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats.query_seconds * 1000:.2f};desc="{stats.queries} query", '
+                f'app;dur={stats.elapsed * 1000:.2f}')
+        return response
+
+    def _teardown_request(self, exception):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return
+        if not stats.recorded:
+            # Exception yang tidak tertangani: after_request tidak pernah dipanggil
+            self._record(stats, 500)
+        request_stats.set(None)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+        stats = request_stats.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        if stats.budget is not None and stats.queries > stats.budget and not stats.over_budget:
+            stats.over_budget = True
+            self.budget_exceeded.inc(stats.endpoint)
+            message = (f'Query budget {stats.endpoint} terlampaui ({stats.budget} query) '
+                       f'di {call_site()}: {statement[:STATEMENT_LOG_LENGTH]}')
+            if self.app.config['QUERY_BUDGET_ACTION'] == 'raise':
+                raise QueryBudgetExceeded(message)
+            self.app.logger.warning(message)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = request_stats.get()
+        endpoint = stats.endpoint if stats is not None else '-'
+        if stats is not None:
+            stats.query_seconds += elapsed
+        self.query_latency.observe(elapsed, endpoint)
+        if elapsed >= self.app.config['SLOW_QUERY_SECONDS']:
+            self.slow_queries.inc(endpoint)
+            self.app.logger.warning('Query lambat %.1f ms [%s] di %s: %s', elapsed * 1000, endpoint,
+                                    call_site(), statement[:STATEMENT_LOG_LENGTH])
+
+    def _handle_error(self, context):
+        # Query yang gagal tidak memanggil after_cursor_execute
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_allowed(self):
+        token = self.app.config['METRICS_TOKEN']
+        if token:
+            return request.headers.get('Authorization') == f'Bearer {token}'
+        # Tanpa token hanya dari mesin yang sama; request lewat reverse proxy
+        # (ada X-Forwarded-For) tetap ditolak walaupun datang dari 127.0.0.1
+        return request.remote_addr in LOCAL_ADDRESSES and 'X-Forwarded-For' not in request.headers
+
+    def metrics_response(self):
+        if not self._metrics_allowed():
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+instrumentation = Instrumentation()
@@ -0,0 +1,194 @@
+import atexit
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from models import db, Story, Comment, StoryLike, CommentLike
+from counters import bump_story_likes, bump_comment_likes, bump_user_stats
+from ranking import refresh_story_rank
+from notifications import queue_notification
+from database import prefer_primary
+from realtime import publish_story_counts, publish_comment_counts
+
+# Toggle like tidak langsung ditulis per request: masuk antrian, lalu worker
+# thread menerapkan semua toggle yang datang dalam LIKE_BATCH_WINDOW detik di
+# satu transaksi (satu kali antri lock tulis SQLite untuk ratusan like di story
+# yang sedang viral). Request menunggu Future sampai batch-nya ter-commit,
+# jadi respons tetap berisi status akhir dan like_count dari counter.
+#
+# Insert memakai ON CONFLICT DO NOTHING dan delete memakai kondisi user+target,
+# jadi batch aman diulang; counter hanya diubah sebesar baris yang benar-benar
+# berubah.
+#
+# Sebelum menunggu, request melepas koneksinya ke pool: worker butuh koneksi
+# dari pool yang sama, jadi request yang menahan koneksi sambil menunggu bisa
+# menghabiskan pool dan membuat semua toggle gagal. Jika batch tidak selesai
+# dalam LIKE_BUFFER_TIMEOUT (atau pool tetap penuh), toggle menaikkan
+# LikeBufferBusy yang dijawab 503 oleh app.
+
+Actor = namedtuple('Actor', 'id username')
+
+LIKE_TARGETS = {
+    'story': (Story, StoryLike, StoryLike.story_id, 'story_id', bump_story_likes, 'story_like'),
+    'comment': (Comment, CommentLike, CommentLike.comment_id, 'comment_id', bump_comment_likes, 'comment_like'),
+}
+
+class LikeBufferBusy(RuntimeError):
+    pass
+
+class LikeToggle:
+    def __init__(self, kind, target_id, actor):
+        self.kind = kind
+        self.target_id = target_id
+        self.actor = actor
+        self.future = Future()
+
+def _insert_ignore(session, like_model, values):
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(like_model).values(**values).on_conflict_do_nothing(
+        index_elements=list(values))
+    return session.execute(statement).rowcount
+
+def apply_like_batch(session, toggles):
+    # Mengembalikan {toggle: (liked, like_count)}; commit dilakukan pemanggil
+    results = {}
+    for kind, (target_model, like_model, like_column, like_key, bump, notification_type) in LIKE_TARGETS.items():
+        kind_toggles = [toggle for toggle in toggles if toggle.kind == kind]
+        if not kind_toggles:
+            continue
+
+        target_ids = {toggle.target_id for toggle in kind_toggles}
+        targets = {target.id: target for target in
+                   session.query(target_model).filter(target_model.id.in_(target_ids))}
+        pairs = {(toggle.actor.id, toggle.target_id) for toggle in kind_toggles}
+        liked_before = set(session.query(like_model.user_id, like_column).filter(
+            db.tuple_(like_model.user_id, like_column).in_(pairs)).all())
+
+        # Terapkan toggle sesuai urutan datang; yang ditulis hanya status akhirnya
+        state = {pair: pair in liked_before for pair in pairs}
+        liked_after_toggle = {}
+        actors = {}
+        for toggle in kind_toggles:
+            pair = (toggle.actor.id, toggle.target_id)
+            if toggle.target_id in targets:
+                state[pair] = not state[pair]
+                actors[pair] = toggle.actor
+            liked_after_toggle[toggle] = state[pair]
+
+        deltas = {}
+        for pair, liked in state.items():
+            user_id, target_id = pair
+            if liked == (pair in liked_before):
+                continue
+            if liked:
+                changed = _insert_ignore(session, like_model, {'user_id': user_id, like_key: target_id})
+            else:
+                changed = -session.execute(db.delete(like_model).where(
+                    like_model.user_id == user_id, like_column == target_id)).rowcount
+            target = targets[target_id]
+            if changed and target.user_id != user_id:
+                # Unlike juga dikirim supaya jumlah aktor di notifikasi yang belum dibaca ikut turun
+                queue_notification(user_id=target.user_id, type=notification_type, actor=actors[pair],
+                                   removed=not liked, **{like_key: target_id})
+            deltas[target_id] = deltas.get(target_id, 0) + changed
+
+        for target_id, delta in deltas.items():
+            if delta:
+                bump(targets[target_id], delta)
+                if kind == 'story':
+                    bump_user_stats(targets[target_id].user_id, likes_received=delta)
+        session.flush()
+
+        # Baca ulang counter (satu query) setelah update di transaksi ini
+        if deltas:
+            session.query(target_model).filter(target_model.id.in_(deltas)).populate_existing().all()
+            for target_id in deltas:
+                target = targets[target_id]
+                if kind == 'story':
+                    refresh_story_rank(target)
+                    publish_story_counts(target, session)
+                else:
+                    publish_comment_counts(target, session)
+
+        for toggle in kind_toggles:
+            target = targets.get(toggle.target_id)
+            results[toggle] = (liked_after_toggle[toggle], target.like_count if target else 0)
+    return results
+
+class LikeBuffer:
+    def __init__(self, app=None):
+        self.app = None
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['like_buffer'] = self
+        atexit.register(self.flush)
+
+    def toggle(self, kind, target_id, user):
+        toggle = LikeToggle(kind, target_id, Actor(user.id, user.username))
+        if not self.app.config['LIKE_BUFFER_ASYNC']:
+            # Mode sinkron: diterapkan langsung di transaksi request
+            result = apply_like_batch(db.session, [toggle])[toggle]
+            db.session.commit()
+            return result
+
+        # Objek yang sudah dimuat (current_user) tetap bisa dibaca setelah close
+        db.session.close()
+        self.queue.put(toggle)
+        self._ensure_worker()
+        try:
+            result = toggle.future.result(timeout=self.app.config['LIKE_BUFFER_TIMEOUT'])
+        except (TimeoutError, PoolTimeoutError) as error:
+            raise LikeBufferBusy(f'Like {kind} {target_id} belum tersimpan') from error
+        # Commit terjadi di worker, jadi penanda read-your-writes dipasang di sini
+        prefer_primary()
+        return result
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='like-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch_size = self.app.config['LIKE_BATCH_SIZE']
+        window = self.app.config['LIKE_BATCH_WINDOW']
+        while True:
+            toggles = [self.queue.get()]
+            # Tunggu sebentar supaya toggle yang berdekatan masuk satu batch
+            try:
+                while len(toggles) < batch_size:
+                    toggles.append(self.queue.get(timeout=window))
+            except queue.Empty:
+                pass
+
+            try:
+                with self.app.app_context():
+                    results = apply_like_batch(db.session, toggles)
+                    db.session.commit()
+            except Exception as error:
+                self.app.logger.exception('Gagal menyimpan %d like', len(toggles))
+                for toggle in toggles:
+                    toggle.future.set_exception(error)
+            else:
+                for toggle in toggles:
+                    toggle.future.set_result(results[toggle])
+            finally:
+                for _ in toggles:
+                    self.queue.task_done()
+
+    def flush(self):
+        # Tunggu sampai semua toggle di antrian tersimpan (dipakai saat shutdown / testing)
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.join()
+
+buffer = LikeBuffer()
@@ -0,0 +1,9 @@
+from app import app
+from migrations import upgrade
+
+with app.app_context():
+    # Upgrade database yang sudah ada tanpa menghapus data
+    changes = upgrade()
+    for change in changes:
+        print(f"➕ {change}")
+    print("✅ Database sudah versi terbaru!" if changes else "✅ Tidak ada perubahan, database sudah versi terbaru.")
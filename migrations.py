@@ -0,0 +1,129 @@
+import os
+from sqlalchemy import inspect
+from config import get_indonesia_time
+from models import db, Story, StoryLike, CommentLike, UploadBlob
+
+# Migration runner untuk meng-upgrade database yang sudah ada (mis. curhatin.db)
+# di tempat, tanpa drop_all() seperti reset_db.py. Urutan upgrade():
+#   1. tabel baru dibuat, kolom baru di models.py ditambahkan (ALTER TABLE ADD COLUMN)
+#   2. migrasi data bernomor yang belum tercatat di schema_migrations dijalankan
+#   3. index/unique index dari models.py yang belum ada dibuat
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('version', db.String(100), primary_key=True),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+def add_missing_columns():
+    # Tambahkan kolom baru dari models.py ke tabel yang sudah ada
+    db.create_all()
+    engine = db.engine
+    inspector = inspect(engine)
+    added = []
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    default = f"'{default}'" if isinstance(default, str) else str(default)
+                    ddl += f' DEFAULT {default}'
+                    if not column.nullable:
+                        ddl += ' NOT NULL'
+                conn.exec_driver_sql(ddl)
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+def add_missing_indexes():
+    inspector = inspect(db.engine)
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    added.append(index.name)
+    return added
+
+# ===== Migrasi data bernomor =====
+
+def _dedupe_likes():
+    # Like ganda (dari request yang balapan) dihapus, sisakan yang paling awal,
+    # supaya unique index user+story / user+comment bisa dibuat
+    for model, target in ((StoryLike, StoryLike.story_id), (CommentLike, CommentLike.comment_id)):
+        keep = db.select(db.func.min(model.id)).group_by(model.user_id, target)
+        db.session.execute(db.delete(model).where(model.id.not_in(keep)))
+    db.session.commit()
+
+def _backfill_counters():
+    from counters import reconcile_counters
+    from notifications import reconcile_unread_counts
+    from ranking import rebuild_rankings
+    reconcile_counters()
+    rebuild_rankings()
+    reconcile_unread_counts()
+
+def _build_search_index():
+    from search_index import rebuild_search_index
+    rebuild_search_index()
+
+def _content_addressed_uploads():
+    # Pindahkan upload lama (nama timestamp) ke penyimpanan content-addressed:
+    # file identik digabung jadi satu blob, variant lama dibuang untuk diproses ulang
+    from images import store_blob, static_path, delete_image_files
+    legacy_files = set()
+    for story in Story.query.filter(Story.image_url.isnot(None)).all():
+        if UploadBlob.query.filter_by(path=story.image_url).first() is not None:
+            continue
+        legacy_path = static_path(story.image_url)
+        if not os.path.exists(legacy_path):
+            continue
+        with open(legacy_path, 'rb') as legacy_file:
+            blob = store_blob(legacy_file.read())
+        if blob is None:
+            continue
+        delete_image_files(None, story.image_variants)
+        legacy_files.add(story.image_url)
+        story.image_url = blob.path
+        story.image_variants = blob.variants
+    db.session.commit()
+    for path in legacy_files:
+        delete_image_files(path)
+
+def _backfill_user_stats():
+    from counters import reconcile_user_stats
+    reconcile_user_stats()
+
+MIGRATIONS = [
+    ('0001_dedupe_likes', _dedupe_likes),
+    ('0002_backfill_counters', _backfill_counters),
+    ('0003_search_index', _build_search_index),
+    ('0004_content_addressed_uploads', _content_addressed_uploads),
+    ('0005_user_stats', _backfill_user_stats),
+]
+
+def applied_migrations():
+    return set(db.session.execute(db.select(schema_migrations.c.version)).scalars())
+
+def upgrade():
+    changes = add_missing_columns()
+
+    done = applied_migrations()
+    for version, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        migrate()
+        db.session.execute(schema_migrations.insert().values(
+            version=version, applied_at=get_indonesia_time()))
+        db.session.commit()
+        changes.append(version)
+
+    changes.extend(add_missing_indexes())
+    return changes
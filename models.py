@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from config import get_indonesia_time
+from database import RoutingSession
 
-db = SQLAlchemy()
+# Session memilih engine primary/replica (lihat database.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -13,6 +15,8 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(200), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: get_indonesia_time())
+    # Counter notifikasi belum dibaca, dibaca di setiap render tanpa COUNT(*) (lihat notifications.py)
+    unread_notification_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     stories = db.relationship('Story', backref='author', lazy=True, cascade='all, delete-orphan')
@@ -20,6 +24,18 @@ class User(UserMixin, db.Model):
     story_likes = db.relationship('StoryLike', backref='user', lazy=True, cascade='all, delete-orphan')
     comment_likes = db.relationship('CommentLike', backref='user', lazy=True, cascade='all, delete-orphan')
     notifications = db.relationship('Notification', backref='user', lazy=True, cascade='all, delete-orphan')
+    stats = db.relationship('UserStats', backref='user', uselist=False, lazy=True, cascade='all, delete-orphan')
+    timeline = db.relationship('UserTimeline', backref='user', lazy=True, cascade='all, delete-orphan')
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    
+    # Statistik profil, dijaga inkremental oleh route tulis (lihat counters.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    stories_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    likes_received = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments_written = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments_received = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Story(db.Model):
     __tablename__ = 'stories'
@@ -28,13 +44,32 @@ class Story(db.Model):
     content = db.Column(db.Text, nullable=False)
     is_anonymous = db.Column(db.Boolean, default=False)
     image_url = db.Column(db.String(200), nullable=True)
+    # Variant hasil images.py: {'thumb'|'card'|'full': {'width', 'height', 'jpg'/'png', 'webp'}}
+    image_variants = db.Column(db.JSON(none_as_null=True), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: get_indonesia_time())
+    # Diisi saat isi/gambar berubah; bagian dari key fragment cache (lihat fragment_cache.py)
+    updated_at = db.Column(db.DateTime, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    # Counter denormalisasi, dijaga oleh route like/comment/delete (lihat counters.py)
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Skor "hot" (like + peluruhan waktu), diperbarui setiap kali like berubah (lihat ranking.py)
+    hot_score = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    
+    __table_args__ = (
+        db.Index('ix_stories_created_at_id', 'created_at', 'id'),
+        db.Index('ix_stories_user_created', 'user_id', 'created_at'),
+        db.Index('ix_stories_like_count_id', 'like_count', 'id'),
+        db.Index('ix_stories_hot_score_id', 'hot_score', 'id'),
+        db.Index('ix_stories_image_url', 'image_url'),
+    )
+    
     # Relationships
     comments = db.relationship('Comment', backref='story', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('StoryLike', backref='story', lazy=True, cascade='all, delete-orphan')
     notifications = db.relationship('Notification', backref='story', lazy=True, cascade='all, delete-orphan')
+    timeline_entries = db.relationship('UserTimeline', backref='story', lazy=True, cascade='all, delete-orphan')
 
 class Comment(db.Model):
     __tablename__ = 'comments'
@@ -46,6 +81,15 @@ class Comment(db.Model):
     story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
     parent_id = db.Column(db.Integer, db.ForeignKey('comments.id'), nullable=True)
     
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    __table_args__ = (
+        db.Index('ix_comments_story_created', 'story_id', 'created_at'),
+        db.Index('ix_comments_parent_id', 'parent_id'),
+        db.Index('ix_comments_user_id', 'user_id'),
+    )
+    
     # Relationships
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('CommentLike', backref='comment', lazy=True, cascade='all, delete-orphan')
@@ -58,6 +102,13 @@ class StoryLike(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: get_indonesia_time())
+    
+    __table_args__ = (
+        # Satu like per user per story; unique index (bukan constraint) supaya bisa
+        # ditambahkan ke database SQLite lama lewat migrations.py
+        db.Index('uq_story_likes_user_story', 'user_id', 'story_id', unique=True),
+        db.Index('ix_story_likes_story_id', 'story_id'),
+    )
 
 class CommentLike(db.Model):
     __tablename__ = 'comment_likes'
@@ -66,6 +117,26 @@ class CommentLike(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     comment_id = db.Column(db.Integer, db.ForeignKey('comments.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: get_indonesia_time())
+    
+    __table_args__ = (
+        db.Index('uq_comment_likes_user_comment', 'user_id', 'comment_id', unique=True),
+        db.Index('ix_comment_likes_comment_id', 'comment_id'),
+    )
+
+class UserTimeline(db.Model):
+    __tablename__ = 'user_timeline'
+    
+    # Feed "Untukmu" per user, ditulis ulang berkala oleh build_timelines.py (timeline.py).
+    # Ikut terhapus bersama story/user (cascade di relationship), jadi aman di database yang menegakkan FK.
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    generated_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        # Halaman feed: seek lewat (user_id, score, story_id)
+        db.Index('ix_user_timeline_user_score', 'user_id', 'score', 'story_id'),
+    )
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
@@ -76,5 +147,28 @@ class Notification(db.Model):
     comment_id = db.Column(db.Integer, db.ForeignKey('comments.id'), nullable=True)
     type = db.Column(db.String(20), nullable=False)
     message = db.Column(db.String(200), nullable=False)
+    # Notifikasi like yang digabung: aktor terakhir + jumlah aktor (lihat notifications.py)
+    actor_id = db.Column(db.Integer, nullable=True)
+    actor_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     is_read = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=lambda: get_indonesia_time())
+    
+    __table_args__ = (
+        # Notifikasi belum dibaca per user (penggabungan like, mark-read, retention)
+        db.Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at'),
+        # Halaman /notifications: keyset per user atas (created_at, id)
+        db.Index('ix_notifications_user_created_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_notifications_story_id', 'story_id'),
+        db.Index('ix_notifications_comment_id', 'comment_id'),
+    )
+
+class UploadBlob(db.Model):
+    __tablename__ = 'upload_blobs'
+    
+    # File upload content-addressed (lihat images.py): satu baris per isi file unik
+    hash = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(200), unique=True, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    variants = db.Column(db.JSON(none_as_null=True), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: get_indonesia_time())
\ No newline at end of file
@@ -0,0 +1,322 @@
+import atexit
+import queue
+import threading
+from datetime import timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config import get_indonesia_time
+from models import db, Notification, User, Story, Comment, StoryLike, CommentLike
+from realtime import publish_after_commit, user_channel
+
+# Pipeline notifikasi: route hanya mencatat event di session (tanpa commit sendiri).
+# Setelah transaksi route ter-commit, event dikirim ke worker thread yang
+# meng-insert secara batch dan menggabungkan notifikasi like yang sama
+# ("aliya dan 4 orang lainnya menyukai curhatan Anda"). Jumlah aktor dihitung
+# ulang dari baris like yang masih ada, jadi unlike ikut mengurangi angkanya.
+
+MESSAGES = {
+    'story_like': 'menyukai curhatan Anda',
+    'comment_like': 'menyukai komentar Anda',
+    'new_comment': 'mengomentari curhatan Anda',
+    'reply': 'membalas komentar Anda',
+}
+
+# Tipe yang digabung menjadi satu baris selama belum dibaca, beserta sumber like-nya
+COALESCE_TYPES = {'story_like', 'comment_like'}
+LIKE_SOURCES = {
+    'story_like': (Story, StoryLike, StoryLike.story_id),
+    'comment_like': (Comment, CommentLike, CommentLike.comment_id),
+}
+
+def build_message(type, actor_name, actor_count):
+    if actor_count > 1:
+        return f'{actor_name} dan {actor_count - 1} orang lainnya {MESSAGES[type]}'
+    return f'{actor_name} {MESSAGES[type]}'
+
+def queue_notification(user_id, type, actor, story_id=None, comment_id=None, removed=False):
+    # Dicatat di session saat ini; baru dikirim setelah commit berhasil.
+    # removed=True (unlike) hanya menghitung ulang notifikasi like yang sudah ada.
+    db.session.info.setdefault('pending_notifications', []).append({
+        'user_id': user_id,
+        'type': type,
+        'actor_id': actor.id,
+        'actor_name': actor.username,
+        'story_id': story_id,
+        'comment_id': comment_id,
+        'created_at': get_indonesia_time(),
+        'removed': removed,
+    })
+
+def bump_unread(session, user_id, delta):
+    session.query(User).filter(User.id == user_id).update(
+        {User.unread_notification_count: User.unread_notification_count + delta},
+        synchronize_session=False
+    )
+
+def release_unread(*criteria):
+    # Kurangi counter untuk notifikasi belum dibaca yang akan terhapus (mis. ikut cascade)
+    rows = db.session.query(Notification.user_id, db.func.count(Notification.id)).filter(
+        Notification.is_read == False, *criteria
+    ).group_by(Notification.user_id).all()
+    for user_id, count in rows:
+        bump_unread(db.session, user_id, -count)
+
+def mark_notifications_read(user, notifications):
+    unread_ids = {notification.id for notification in notifications if not notification.is_read}
+    if unread_ids:
+        updated = Notification.query.filter(
+            Notification.id.in_(unread_ids), Notification.is_read == False
+        ).update({'is_read': True}, synchronize_session=False)
+        user.unread_notification_count = User.unread_notification_count - updated
+        # Baris yang sudah dimuat dilepas dari session supaya commit tidak meng-expire
+        # semuanya; tanpa ini template me-SELECT ulang setiap notifikasi satu per satu
+        for notification in notifications:
+            db.session.expunge(notification)
+        db.session.commit()
+    return unread_ids
+
+def prune_notifications(retention_days, max_per_user, batch_size=1000):
+    # Hapus notifikasi yang sudah dibaca: lebih tua dari retention_days, atau di luar
+    # max_per_user terbaru per user. Dihapus per batch supaya lock tulis tetap singkat.
+    cutoff = get_indonesia_time() - timedelta(days=retention_days)
+    stale = db.select(Notification.id).where(
+        Notification.is_read == True, Notification.created_at < cutoff)
+
+    ranked = db.select(
+        Notification.id,
+        Notification.is_read,
+        db.func.row_number().over(
+            partition_by=Notification.user_id,
+            order_by=(Notification.created_at.desc(), Notification.id.desc())
+        ).label('position')
+    ).subquery()
+    overflow = db.select(ranked.c.id).where(ranked.c.is_read == True, ranked.c.position > max_per_user)
+
+    deleted = 0
+    for candidates in (stale, overflow):
+        while True:
+            ids = db.session.execute(candidates.limit(batch_size)).scalars().all()
+            if not ids:
+                break
+            Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+    return deleted
+
+def reconcile_unread_counts():
+    unread = db.select(db.func.count(Notification.id)).where(
+        Notification.user_id == User.id, Notification.is_read == False).scalar_subquery()
+    db.session.execute(db.update(User).values(unread_notification_count=unread))
+    db.session.commit()
+
+def _coalesce_key(event_data):
+    if event_data['type'] in COALESCE_TYPES:
+        return (event_data['user_id'], event_data['type'], event_data['story_id'], event_data['comment_id'])
+    return None
+
+def _drop_orphans(session, events):
+    # Story/komentar bisa terhapus setelah event diantrikan; event seperti itu dibuang
+    story_ids = {event_data['story_id'] for event_data in events if event_data['story_id'] is not None}
+    comment_ids = {event_data['comment_id'] for event_data in events if event_data['comment_id'] is not None}
+    if story_ids:
+        story_ids = set(session.execute(db.select(Story.id).where(Story.id.in_(story_ids))).scalars())
+    if comment_ids:
+        comment_ids = set(session.execute(db.select(Comment.id).where(Comment.id.in_(comment_ids))).scalars())
+    return [event_data for event_data in events
+            if (event_data['story_id'] is None or event_data['story_id'] in story_ids)
+            and (event_data['comment_id'] is None or event_data['comment_id'] in comment_ids)]
+
+def _current_likers(session, type, target_ids):
+    # {target_id: (jumlah pe-like selain pemilik, id & nama pe-like terakhir)}
+    target_model, like_model, like_column = LIKE_SOURCES[type]
+    rows = session.query(like_column, db.func.count(like_model.id), db.func.max(like_model.id)).join(
+        target_model, target_model.id == like_column).filter(
+        like_column.in_(target_ids), like_model.user_id != target_model.user_id
+    ).group_by(like_column).all()
+    latest = {row.id: row for row in session.query(like_model.id, User.id.label('user_id'), User.username).join(
+        User, User.id == like_model.user_id).filter(like_model.id.in_([row[2] for row in rows]))}
+    return {target_id: (count, latest[like_id].user_id, latest[like_id].username)
+            for target_id, count, like_id in rows if like_id in latest}
+
+def _still_liked(session, type, pairs):
+    _, like_model, like_column = LIKE_SOURCES[type]
+    if not pairs:
+        return set()
+    return set(session.query(like_model.user_id, like_column).filter(
+        db.tuple_(like_model.user_id, like_column).in_(pairs)).all())
+
+def apply_notification_batch(session, events):
+    # Gabungkan event like per target dengan notifikasi belum dibaca yang sudah ada;
+    # jumlah aktor selalu dihitung dari like yang masih ada saat batch ini diterapkan
+    events = _drop_orphans(session, events)
+    groups = {}
+    singles = []
+    for event_data in events:
+        key = _coalesce_key(event_data)
+        if key is None:
+            if not event_data.get('removed'):
+                singles.append(event_data)
+            continue
+        group = groups.setdefault(key, {'added': []})
+        if not event_data.get('removed'):
+            group['added'].append(event_data)
+
+    existing = {}
+    likers = {}
+    still_liked = {}
+    if groups:
+        user_ids = {key[0] for key in groups}
+        story_ids = {key[2] for key in groups if key[2] is not None}
+        comment_ids = {key[3] for key in groups if key[3] is not None}
+        rows = session.query(Notification).filter(
+            Notification.user_id.in_(user_ids),
+            Notification.type.in_(COALESCE_TYPES),
+            Notification.is_read == False,
+            db.or_(Notification.story_id.in_(story_ids), Notification.comment_id.in_(comment_ids))
+        ).all()
+        for notification in rows:
+            key = (notification.user_id, notification.type, notification.story_id, notification.comment_id)
+            existing.setdefault(key, notification)
+
+        for type in COALESCE_TYPES:
+            type_keys = [key for key in groups if key[1] == type]
+            if not type_keys:
+                continue
+            likers[type] = _current_likers(session, type, {key[2] or key[3] for key in type_keys})
+            still_liked[type] = _still_liked(session, type, {
+                (event_data['actor_id'], key[2] or key[3]) for key in type_keys for event_data in groups[key]['added']})
+
+    created = []
+    latest_message = {}
+    released = {}
+    for key, group in groups.items():
+        user_id, type, story_id, comment_id = key
+        target_id = story_id or comment_id
+        notification = existing.get(key)
+        # Like baru yang masih ada (like lalu unlike di antara antrian tidak dihitung)
+        added = [event_data for event_data in group['added']
+                 if (event_data['actor_id'], target_id) in still_liked[type]]
+        current = likers[type].get(target_id)
+        if current is None:
+            # Semua like sudah ditarik: notifikasi yang belum dibaca ikut dihapus
+            if notification is not None:
+                session.delete(notification)
+                released[user_id] = released.get(user_id, 0) + 1
+            continue
+        actor_count, actor_id, actor_name = current
+        if notification is None:
+            if not added:
+                continue
+            singles.append(dict(added[-1], actor_id=actor_id, actor_name=actor_name, actor_count=actor_count))
+            continue
+        notification.actor_count = actor_count
+        notification.actor_id = actor_id
+        notification.message = build_message(type, actor_name, actor_count)
+        if added:
+            notification.created_at = added[-1]['created_at']
+            latest_message[user_id] = notification.message
+
+    for event_data in singles:
+        actor_count = event_data.get('actor_count', 1)
+        notification = Notification(
+            user_id=event_data['user_id'],
+            story_id=event_data['story_id'],
+            comment_id=event_data['comment_id'],
+            type=event_data['type'],
+            actor_id=event_data['actor_id'],
+            actor_count=actor_count,
+            message=build_message(event_data['type'], event_data['actor_name'], actor_count),
+            created_at=event_data['created_at'],
+        )
+        session.add(notification)
+        created.append(notification)
+        latest_message[notification.user_id] = notification.message
+
+    unread_delta = {user_id: -count for user_id, count in released.items()}
+    for notification in created:
+        unread_delta[notification.user_id] = unread_delta.get(notification.user_id, 0) + 1
+    for user_id, delta in unread_delta.items():
+        if delta:
+            bump_unread(session, user_id, delta)
+
+    # Push badge ke tab yang sedang dibuka penerima (dikirim setelah commit)
+    if latest_message or released:
+        session.flush()
+        unread = dict(session.query(User.id, User.unread_notification_count).filter(
+            User.id.in_(set(latest_message) | set(released))).all())
+        for user_id in set(latest_message) | set(released):
+            payload = {'unread_count': max(unread.get(user_id) or 0, 0)}
+            if user_id in latest_message:
+                payload['message'] = latest_message[user_id]
+            publish_after_commit(user_channel(user_id), 'notification', payload, session)
+    return created
+
+class NotificationDispatcher:
+    def __init__(self, app=None):
+        self.app = None
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['notification_dispatcher'] = self
+        event.listen(Session, 'before_commit', self._before_commit)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_soft_rollback', self._after_rollback)
+        atexit.register(self.flush)
+
+    def _before_commit(self, session):
+        # Mode sinkron: notifikasi ikut di-insert dalam commit yang sama dengan aksi user
+        if self.app.config['NOTIFICATION_ASYNC']:
+            return
+        events = session.info.pop('pending_notifications', None)
+        if events:
+            apply_notification_batch(session, events)
+
+    def _after_commit(self, session):
+        events = session.info.pop('pending_notifications', None)
+        if events:
+            for event_data in events:
+                self.queue.put(event_data)
+            self._ensure_worker()
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('pending_notifications', None)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch_size = self.app.config['NOTIFICATION_BATCH_SIZE']
+        window = self.app.config['NOTIFICATION_BATCH_WINDOW']
+        while True:
+            events = [self.queue.get()]
+            # Tunggu sebentar supaya event yang berdekatan masuk satu batch
+            try:
+                while len(events) < batch_size:
+                    events.append(self.queue.get(timeout=window))
+            except queue.Empty:
+                pass
+
+            try:
+                with self.app.app_context():
+                    apply_notification_batch(db.session, events)
+                    db.session.commit()
+            except Exception:
+                self.app.logger.exception('Gagal menyimpan %d notifikasi', len(events))
+            finally:
+                for _ in events:
+                    self.queue.task_done()
+
+    def flush(self):
+        # Tunggu sampai semua event di antrian tersimpan (dipakai saat shutdown / testing)
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.join()
+
+dispatcher = NotificationDispatcher()
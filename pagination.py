@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+from models import db
+
+# Keyset (cursor) pagination: posisi halaman disimpan sebagai nilai kolom urutan
+# dari item terakhir, jadi halaman ke-1000 sama murahnya dengan halaman pertama
+# (seek lewat index, tanpa COUNT(*) dan OFFSET).
+
+class InvalidCursor(ValueError):
+    pass
+
+class CursorPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, columns):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise InvalidCursor(token)
+
+    values = []
+    for column, value in zip(columns, payload):
+        try:
+            if isinstance(column.type, db.DateTime):
+                value = datetime.fromisoformat(value)
+            else:
+                value = column.type.python_type(value)
+        except (ValueError, TypeError):
+            raise InvalidCursor(token)
+        values.append(value)
+    return values
+
+def keyset_condition(columns, cursor, descending=True):
+    # (a, b) < (va, vb)  ->  a < va OR (a = va AND b < vb), dibangun dari belakang
+    values = decode_cursor(cursor, columns)
+    condition = None
+    for column, value in reversed(list(zip(columns, values))):
+        after = column < value if descending else column > value
+        if condition is None:
+            condition = after
+        else:
+            condition = db.or_(after, db.and_(column == value, condition))
+    return condition
+
+def next_cursor(items, columns, limit):
+    # items diambil limit + 1 baris; baris ekstra hanya penanda masih ada halaman berikutnya
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+def keyset_page(query, columns, limit, cursor=None):
+    # columns: kolom urutan (semua DESC), kolom terakhir harus unik (biasanya id)
+    if cursor:
+        query = query.filter(keyset_condition(columns, cursor))
+
+    items = query.order_by(*[column.desc() for column in columns]).limit(limit + 1).all()
+    return CursorPage(*next_cursor(items, columns, limit))
@@ -0,0 +1,16 @@
+from app import app
+from images import schedule_image_processing
+from models import UploadBlob
+
+with app.app_context():
+    # Buat variant untuk gambar yang belum (atau gagal) diproses, secara sinkron.
+    # Upload lama dipindah ke penyimpanan content-addressed oleh migrate_db.py.
+    app.config['IMAGE_PROCESSING_ASYNC'] = False
+    blobs = UploadBlob.query.filter(UploadBlob.variants.is_(None)).all()
+    for blob in blobs:
+        try:
+            schedule_image_processing(blob)
+            print(f"🖼️ {blob.path}")
+        except OSError as error:
+            print(f"⚠️ {blob.path}: {error}")
+    print(f"✅ {len(blobs)} gambar selesai diproses!")
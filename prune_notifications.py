@@ -0,0 +1,10 @@
+from app import app
+from notifications import prune_notifications
+
+with app.app_context():
+    # Jalankan berkala (mis. cron harian) untuk membuang notifikasi lama yang sudah dibaca
+    deleted = prune_notifications(
+        retention_days=app.config['NOTIFICATION_RETENTION_DAYS'],
+        max_per_user=app.config['NOTIFICATION_MAX_PER_USER']
+    )
+    print(f"🧹 {deleted} notifikasi lama dihapus")
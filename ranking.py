@@ -0,0 +1,42 @@
+import math
+from datetime import datetime
+from flask import current_app
+from models import db, Story
+
+# Ranking "populer" disimpan langsung di tabel stories (like_count & hot_score,
+# keduanya ber-index), jadi halaman populer cukup membaca index tanpa agregasi
+# COUNT(*) atas story_likes.
+
+HOT_EPOCH = datetime(2025, 1, 1)
+
+def hot_score(like_count, created_at):
+    # Gaya Reddit: setiap kelipatan 10 like setara dengan HOT_DECAY_SECONDS waktu posting
+    # yang lebih baru, jadi story lama tidak "membeku" di atas.
+    if created_at.tzinfo is not None:
+        created_at = created_at.replace(tzinfo=None)
+    order = math.log10(max(like_count, 1))
+    seconds = (created_at - HOT_EPOCH).total_seconds()
+    return round(order + seconds / current_app.config['POPULAR_HOT_DECAY_SECONDS'], 7)
+
+def refresh_story_rank(story):
+    # Dipanggil setelah flush, saat like_count sudah berisi nilai terbaru di transaksi ini
+    story.hot_score = hot_score(story.like_count, story.created_at)
+
+def rebuild_rankings(batch_size=5000):
+    # Per batch (keyset atas id) supaya tetap ringan untuk jutaan story
+    last_id = 0
+    while True:
+        rows = db.session.query(Story.id, Story.like_count, Story.created_at).filter(
+            Story.id > last_id).order_by(Story.id).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.execute(db.update(Story), [
+            {'id': row.id, 'hot_score': hot_score(row.like_count, row.created_at)} for row in rows
+        ])
+        db.session.commit()
+        last_id = rows[-1].id
+
+def popular_sort_column():
+    if current_app.config['POPULAR_RANKING'] == 'hot':
+        return Story.hot_score
+    return Story.like_count
@@ -0,0 +1,205 @@
+import json
+import queue
+import threading
+import time
+from flask import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db
+
+try:
+    import redis
+except ImportError:  # opsional: tanpa redis hanya broker lokal (satu proses)
+    redis = None
+
+# Push real-time lewat server-sent events (/stream). Route dan worker hanya
+# mencatat event di session (publish_after_commit); setelah commit berhasil
+# event dikirim ke broker lalu dibagikan ke subscriber channel-nya:
+#   user:<id>   notifikasi baru + jumlah belum dibaca
+#   story:<id>  counter like/komentar story dan like komentarnya
+#
+# Broker lokal cukup untuk satu proses. Dengan beberapa worker/proses, set
+# REALTIME_BROKER_URL (redis://...) supaya event dari proses lain ikut sampai.
+# Subscriber menunggu di queue.Queue, jadi satu koneksi = satu thread di
+# server threaded, atau satu greenlet di gunicorn -k gevent. Supaya koneksi
+# yang terbuka lama tidak menghabiskan worker, jumlahnya dibatasi
+# REALTIME_MAX_CONNECTIONS per proses (selebihnya 503, browser kembali ke
+# polling) dan tiap koneksi ditutup setelah REALTIME_MAX_STREAM detik.
+
+CHANNEL_PREFIX = 'curhatin:'
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def story_channel(story_id):
+    return f'story:{story_id}'
+
+def format_event(event_name, data):
+    # Diformat sekali saat publish, bukan sekali per subscriber
+    payload = json.dumps(data, separators=(',', ':'))
+    return f'event: {event_name}\ndata: {payload}\n\n'
+
+def publish_after_commit(channel, event_name, data, session=None):
+    # Dicatat di session; baru dikirim setelah commit berhasil, dibuang saat rollback
+    session = session if session is not None else db.session
+    session.info.setdefault('realtime_events', []).append((channel, format_event(event_name, data)))
+
+# Counter dikirim sebagai nilai terbaru (bukan selisih), jadi event yang
+# terlewat atau terkirim dua kali tidak membuat angka di halaman melenceng
+def publish_story_counts(story, session=None):
+    publish_after_commit(story_channel(story.id), 'counts', {
+        'story_id': story.id, 'like_count': story.like_count, 'comment_count': story.comment_count,
+    }, session)
+
+def publish_comment_counts(comment, session=None):
+    publish_after_commit(story_channel(comment.story_id), 'comment_counts', {
+        'comment_id': comment.id, 'like_count': comment.like_count,
+    }, session)
+
+class LocalBroker:
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, channel, frame):
+        self.deliver(channel, frame)
+
+class RedisBroker:
+    # Publish ke Redis; satu thread listener per proses membagikan ke subscriber lokal
+    def __init__(self, url, deliver):
+        self.deliver = deliver
+        self.client = redis.Redis.from_url(url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(**{CHANNEL_PREFIX + '*': self._on_message})
+        self.thread = self.pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def publish(self, channel, frame):
+        self.client.publish(CHANNEL_PREFIX + channel, frame)
+
+    def _on_message(self, message):
+        channel = message['channel'].decode()[len(CHANNEL_PREFIX):]
+        self.deliver(channel, message['data'].decode())
+
+class Subscription:
+    def __init__(self, hub, channels, max_queue):
+        self.hub = hub
+        self.channels = set(channels)
+        self.queue = queue.Queue(max_queue)
+
+    def put(self, frame):
+        # Client lambat: event tertua dibuang (counter selalu berisi nilai terbaru)
+        while True:
+            try:
+                self.queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+class RealtimeHub:
+    def __init__(self, app=None):
+        self.app = None
+        self.broker = None
+        self._subscribers = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        broker_url = app.config['REALTIME_BROKER_URL']
+        if broker_url:
+            if redis is None:
+                raise RuntimeError('REALTIME_BROKER_URL membutuhkan paket redis')
+            self.broker = RedisBroker(broker_url, self._deliver)
+        else:
+            self.broker = LocalBroker(self._deliver)
+        app.extensions['realtime'] = self
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_soft_rollback', self._after_rollback)
+
+    def _after_commit(self, session):
+        for channel, frame in session.info.pop('realtime_events', ()):
+            try:
+                self.broker.publish(channel, frame)
+            except Exception:
+                # Push hanya pelengkap; kegagalan broker tidak boleh menggagalkan request
+                self.app.logger.exception('Gagal publish event ke %s', channel)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('realtime_events', None)
+
+    def _deliver(self, channel, frame):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(frame)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.app.config['REALTIME_QUEUE_SIZE'])
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def _acquire_stream(self):
+        with self._lock:
+            if self._streams >= self.app.config['REALTIME_MAX_CONNECTIONS']:
+                return False
+            self._streams += 1
+            return True
+
+    def _release_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def stream(self, channels, initial=()):
+        if not self._acquire_stream():
+            return Response('Terlalu banyak koneksi real-time\n', status=503, mimetype='text/plain',
+                            headers={'Retry-After': str(self.app.config['REALTIME_MAX_STREAM'])})
+        # Generator tidak menyentuh request/database: koneksi DB sudah kembali ke pool
+        heartbeat = self.app.config['REALTIME_HEARTBEAT']
+        deadline = time.monotonic() + self.app.config['REALTIME_MAX_STREAM']
+        retry_ms = int(self.app.config['REALTIME_RETRY'] * 1000)
+
+        def generate():
+            subscription = self.subscribe(channels)
+            try:
+                yield f'retry: {retry_ms}\n\n'
+                yield from initial
+                while time.monotonic() < deadline:
+                    # Komentar ping sekaligus mendeteksi client yang sudah putus
+                    yield subscription.get(heartbeat) or ': ping\n\n'
+            finally:
+                subscription.close()
+
+        # Koneksi ditutup berkala (REALTIME_MAX_STREAM); EventSource otomatis menyambung lagi
+        response = Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        # Dipanggil saat response ditutup, juga jika generator belum sempat berjalan
+        response.call_on_close(self._release_stream)
+        return response
+
+hub = RealtimeHub()
@@ -0,0 +1,9 @@
+from app import app
+from search_index import rebuild_search_index
+
+with app.app_context():
+    # Buat tabel FTS + trigger jika belum ada, lalu index ulang semua story & komentar
+    if rebuild_search_index():
+        print("✅ Index pencarian berhasil dibangun ulang!")
+    else:
+        print("⚠️ Database bukan SQLite, pencarian memakai ILIKE biasa.")
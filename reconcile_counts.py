@@ -0,0 +1,12 @@
+from app import app
+from counters import reconcile_counters, reconcile_user_stats
+from notifications import reconcile_unread_counts
+from ranking import rebuild_rankings
+
+with app.app_context():
+    # Hitung ulang counter dari tabel sumbernya (jika angka tidak cocok)
+    reconcile_counters()
+    rebuild_rankings()
+    reconcile_unread_counts()
+    reconcile_user_stats()
+    print("✅ Counter like/komentar/notifikasi, statistik profil dan ranking populer berhasil disinkronkan!")
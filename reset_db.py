@@ -1,7 +1,10 @@
 from app import app, db
+from search_index import drop_search_index
+from migrations import upgrade
 
 with app.app_context():
     # Hapus semua tabel dan buat ulang
+    drop_search_index()
     db.drop_all()
-    db.create_all()
+    upgrade()
     print("✅ Database berhasil direset!")
\ No newline at end of file
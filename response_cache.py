@@ -0,0 +1,251 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, session
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from werkzeug.wrappers import Response
+from models import Story, Comment, StoryLike
+
+# Cache seluruh response untuk pengunjung yang belum login (halaman index,
+# search, detail story, /api/stories): isinya sama untuk semua orang, jadi
+# lonjakan trafik dari link yang dibagikan cukup dilayani dari memori.
+#
+# - Invalidasi per scope, dibuang saat commit:
+#   - ('story', id) untuk halaman detail story, dibuang oleh like, komentar,
+#     like komentar, edit, dan hapus pada story itu;
+#   - FEED untuk halaman daftar (index, search, /api/stories), dibuang hanya
+#     saat story dibuat, dihapus, atau isinya diubah.
+#   Like tidak membuang halaman daftar, jadi saat story viral hit rate tetap
+#   tinggi; counter di kartu boleh tertinggal sampai TTL.
+# - Entry segar selama RESPONSE_CACHE_TTL detik. Entry yang hanya kedaluwarsa
+#   (TTL) masih boleh dikirim RESPONSE_CACHE_STALE detik lagi sambil satu
+#   thread merender ulang di background (stale-while-revalidate).
+# - ETag/Last-Modified dipasang sehingga browser mendapat 304 tanpa body.
+# - Request login, request dengan flash message, dan response yang mengubah
+#   session tidak pernah di-cache.
+
+FEED = ('feed', None)
+
+# Kolom Story yang hanya tampil di halaman detail dan sebagai counter di kartu
+COUNTER_COLUMNS = frozenset({'like_count', 'comment_count', 'hot_score'})
+
+def scope_for(kwargs):
+    story_id = kwargs.get('story_id')
+    return ('story', story_id) if story_id is not None else FEED
+
+def _changed_columns(obj):
+    state = inspect(obj)
+    return {column.key for column in state.mapper.column_attrs if state.attrs[column.key].history.has_changes()}
+
+class RenderTicket:
+    # Render yang sedang berjalan; ditandai basi jika scope-nya diinvalidasi
+    # sebelum hasilnya disimpan
+    __slots__ = ('scope', 'stale')
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.stale = False
+
+class CachedResponse:
+    def __init__(self, body, status, headers, scope):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.scope = scope
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.stored_at = time.monotonic()
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.app = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_scope = {}
+        self._rendering = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['response_cache'] = self
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_soft_rollback', self._after_rollback)
+
+    def _after_flush(self, session, flush_context):
+        scopes = session.info.setdefault('response_cache_scopes', set())
+        for obj in (*session.new, *session.deleted):
+            if isinstance(obj, Story):
+                scopes.update((FEED, ('story', obj.id)))
+            elif isinstance(obj, (Comment, StoryLike)):
+                scopes.add(('story', obj.story_id))
+        for obj in session.dirty:
+            if isinstance(obj, Story):
+                scopes.add(('story', obj.id))
+                if _changed_columns(obj) - COUNTER_COLUMNS:
+                    scopes.add(FEED)
+            elif isinstance(obj, Comment):
+                # Like komentar (lewat like_buffer) selalu menaikkan Comment.like_count
+                scopes.add(('story', obj.story_id))
+
+    def _after_commit(self, session):
+        scopes = session.info.pop('response_cache_scopes', None)
+        if scopes:
+            self.invalidate(*scopes)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('response_cache_scopes', None)
+
+    def invalidate(self, *scopes):
+        with self._lock:
+            for scope in scopes:
+                for key in self._keys_by_scope.pop(scope, ()):
+                    self._entries.pop(key, None)
+                for ticket in self._rendering.get(scope, ()):
+                    ticket.stale = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_scope.clear()
+
+    def _cacheable_request(self):
+        return (self.app.config['RESPONSE_CACHE_SIZE']
+                and request.method in ('GET', 'HEAD')
+                and not current_user.is_authenticated
+                and '_flashes' not in session)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _start_render(self, scope):
+        # Dipasang sebelum render: perubahan selama render membuat hasilnya tidak disimpan
+        ticket = RenderTicket(scope)
+        with self._lock:
+            self._rendering.setdefault(scope, set()).add(ticket)
+        return ticket
+
+    def _finish_render(self, ticket):
+        tickets = self._rendering.get(ticket.scope)
+        if tickets is not None:
+            tickets.discard(ticket)
+            if not tickets:
+                del self._rendering[ticket.scope]
+
+    def _store(self, key, response, ticket):
+        storable = not (response.status_code != 200 or response.direct_passthrough or session.modified
+                        or 'Set-Cookie' in response.headers)
+        entry = None
+        if storable:
+            headers = [(name, value) for name, value in response.headers
+                       if name.lower() in ('content-type', 'vary')]
+            entry = CachedResponse(response.get_data(), response.status_code, headers, ticket.scope)
+        with self._lock:
+            self._finish_render(ticket)
+            if entry is None or ticket.stale:
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._keys_by_scope.setdefault(entry.scope, set()).add(key)
+            while len(self._entries) > self.app.config['RESPONSE_CACHE_SIZE']:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._forget(old_key, old_entry.scope)
+        return entry
+
+    def _forget(self, key, scope):
+        keys = self._keys_by_scope.get(scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_scope[scope]
+
+    def _respond(self, entry, state):
+        response = Response(entry.body, status=entry.status, headers=entry.headers)
+        return self._finalize(response, entry, state)
+
+    def _finalize(self, response, entry, state):
+        response.set_etag(entry.etag)
+        response.last_modified = entry.last_modified
+        # Browser selalu revalidasi (304 murah); isi berbeda untuk user yang login
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        response.headers['X-Cache'] = state
+        return response.make_conditional(request)
+
+    def _schedule_refresh(self, key, view, args, kwargs):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, view, args, kwargs),
+                         name='response-cache-refresh', daemon=True).start()
+
+    def _refresh(self, key, view, args, kwargs):
+        path, _, query_string = key.partition('?')
+        ticket = self._start_render(scope_for(kwargs))
+        try:
+            # Request anonim tanpa cookie, jadi hasilnya sama dengan yang akan di-cache
+            with self.app.test_request_context(path, query_string=query_string):
+                entry = self._store(key, self.app.make_response(view(*args, **kwargs)), ticket)
+            if entry is None:
+                # Mis. story sudah dihapus (404): jangan layani versi lama lagi
+                with self._lock:
+                    old_entry = self._entries.pop(key, None)
+                    if old_entry is not None:
+                        self._forget(key, old_entry.scope)
+        except Exception:
+            self.app.logger.exception('Gagal merender ulang cache %s', key)
+            with self._lock:
+                self._finish_render(ticket)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self._cacheable_request():
+                return view(*args, **kwargs)
+
+            key = request.full_path
+            entry = self._get(key)
+            if entry is not None:
+                # Entry yang diinvalidasi sudah dibuang, jadi yang tersisa hanya bisa kedaluwarsa TTL
+                ttl = self.app.config['RESPONSE_CACHE_TTL']
+                age = time.monotonic() - entry.stored_at
+                if age < ttl:
+                    self.hits += 1
+                    return self._respond(entry, 'HIT')
+                if age < ttl + self.app.config['RESPONSE_CACHE_STALE']:
+                    self.hits += 1
+                    self._schedule_refresh(key, view, args, kwargs)
+                    return self._respond(entry, 'STALE')
+
+            self.misses += 1
+            ticket = self._start_render(scope_for(kwargs))
+            try:
+                response = self.app.make_response(view(*args, **kwargs))
+            except BaseException:
+                with self._lock:
+                    self._finish_render(ticket)
+                raise
+            entry = self._store(key, response, ticket)
+            if entry is None:
+                return response
+            return self._finalize(response, entry, 'MISS')
+        return wrapper
+
+cache = ResponseCache()
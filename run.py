@@ -0,0 +1,13 @@
+# Server development. Dipisah dari app.py karena process pool gambar (spawn, lihat
+# images.py) meng-import ulang modul __main__ di setiap worker: modul ini tidak
+# punya efek samping saat di-import, jadi worker tidak ikut menjalankan init app
+# (migrasi, build asset, dst).
+
+if __name__ == '__main__':
+    from app import app
+    from migrations import upgrade as upgrade_database
+
+    with app.app_context():
+        upgrade_database()
+    print("🚀 Server starting on http://localhost:5000")
+    app.run(debug=True)
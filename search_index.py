@@ -0,0 +1,153 @@
+import re
+from sqlalchemy import inspect
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from models import db, Story
+from feed import card_query, cards_by_ids, paginate_cards
+
+# Index full-text SQLite FTS5 untuk /search. Tabel FTS memakai external content
+# (teks tetap hanya disimpan di stories/comments) dan disinkronkan oleh trigger,
+# jadi posting, edit, delete, maupun cascade delete otomatis ikut ter-update.
+
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+# Partikel/enklitik bahasa Indonesia yang dibuang dari kata kunci, lalu sisanya
+# dicari sebagai prefix: "sedihnya" -> sedih* (cocok dengan sedih, sedihnya, ...)
+INDONESIAN_SUFFIXES = ('nya', 'lah', 'kah', 'pun', 'ku', 'mu')
+MIN_STEM_LENGTH = 4
+
+# Kata dasar yang kebetulan berakhiran sama dengan partikel di atas; tidak dipotong
+# ("sekolah" bukan sekol + -lah, "masalah" bukan masa + -lah). Juga berlaku untuk
+# bentuk berimbuhan (bersalah, bertanya, menikah, berlaku, ketemu).
+ROOT_WORDS = frozenset({
+    'sekolah', 'masalah', 'salah', 'kalah', 'olah', 'belah', 'pilah', 'celah', 'istilah',
+    'makalah', 'lelah', 'telah', 'malah', 'jumlah', 'ulah', 'kilah', 'mengalah',
+    'langkah', 'tingkah', 'nikah', 'berkah', 'sedekah',
+    'tanya', 'punya', 'hanya',
+    'ampun', 'himpun', 'rumpun',
+    'aku', 'buku', 'laku', 'paku', 'saku', 'suku', 'kaku', 'beku', 'siku', 'kuku', 'perilaku',
+    'temu', 'tamu', 'jemu', 'ilmu', 'jamu',
+})
+ROOT_PREFIXES = ('meng', 'meny', 'mem', 'men', 'me', 'ber', 'ter', 'per', 'pe', 'ke', 'se', 'di')
+
+FTS_TABLES = {
+    'stories_fts': 'stories',
+    'comments_fts': 'comments',
+}
+
+_search_available = None
+
+def _fts_ddl(fts_table, source_table):
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            content, content='{source_table}', content_rowid='id',
+            tokenize='{FTS_TOKENIZE}', prefix='2 3')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source_table} BEGIN
+            INSERT INTO {fts_table}(rowid, content) VALUES (new.id, new.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, content) VALUES ('delete', old.id, old.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF content ON {source_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO {fts_table}(rowid, content) VALUES (new.id, new.content);
+        END""",
+    ]
+
+def is_supported():
+    return db.engine.dialect.name == 'sqlite'
+
+def ensure_search_index():
+    if not is_supported():
+        return False
+    with db.engine.begin() as conn:
+        for fts_table, source_table in FTS_TABLES.items():
+            for ddl in _fts_ddl(fts_table, source_table):
+                conn.exec_driver_sql(ddl)
+    return True
+
+def rebuild_search_index():
+    # Isi ulang index dari data yang sudah ada (database lama / setelah bulk import)
+    if not ensure_search_index():
+        return False
+    with db.engine.begin() as conn:
+        for fts_table in FTS_TABLES:
+            conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+    global _search_available
+    _search_available = True
+    return True
+
+def drop_search_index():
+    if not is_supported():
+        return
+    with db.engine.begin() as conn:
+        for fts_table, source_table in FTS_TABLES.items():
+            for suffix in ('ai', 'ad', 'au'):
+                conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {fts_table}')
+
+def search_available():
+    # Dicek sekali per proses; tanpa tabel FTS pencarian jatuh ke ILIKE
+    global _search_available
+    if _search_available is None:
+        _search_available = is_supported() and all(
+            inspect(db.engine).has_table(fts_table) for fts_table in FTS_TABLES
+        )
+    return _search_available
+
+def _is_root_word(term):
+    return term in ROOT_WORDS or any(
+        term.startswith(prefix) and term[len(prefix):] in ROOT_WORDS for prefix in ROOT_PREFIXES)
+
+def _stem(term):
+    if _is_root_word(term):
+        return term
+    for suffix in INDONESIAN_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= MIN_STEM_LENGTH:
+            return term[:-len(suffix)]
+    return term
+
+def build_match_query(query):
+    # Setiap kata di-quote (aman dari sintaks FTS) dan dicari sebagai prefix, semua harus cocok
+    terms = [_stem(term) for term in re.findall(r'\w+', query.lower())]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def _ranked_story_ids_sql():
+    # bm25 makin kecil makin relevan; kecocokan lewat komentar diberi bobot lebih rendah
+    sql = 'SELECT rowid AS story_id, bm25(stories_fts) AS score FROM stories_fts WHERE stories_fts MATCH :match'
+    if current_app.config['SEARCH_INCLUDE_COMMENTS']:
+        sql += """
+            UNION ALL
+            SELECT comments.story_id, bm25(comments_fts) * :comment_weight
+            FROM comments_fts JOIN comments ON comments.id = comments_fts.rowid
+            WHERE comments_fts MATCH :match"""
+    return f'SELECT story_id, MIN(score) AS score FROM ({sql}) GROUP BY story_id'
+
+class SearchPagination(Pagination):
+    def _params(self):
+        return {
+            'match': self._query_args['match'],
+            'comment_weight': current_app.config['SEARCH_COMMENT_WEIGHT'],
+        }
+
+    def _query_items(self):
+        sql = _ranked_story_ids_sql() + ' ORDER BY score, story_id DESC LIMIT :limit OFFSET :offset'
+        params = dict(self._params(), limit=self.per_page, offset=self._query_offset)
+        story_ids = [row.story_id for row in db.session.execute(db.text(sql), params)]
+        if not story_ids:
+            return []
+        return cards_by_ids(story_ids)
+
+    def _query_count(self):
+        sql = f'SELECT COUNT(*) FROM ({_ranked_story_ids_sql()})'
+        return db.session.execute(db.text(sql), self._params()).scalar()
+
+def search_stories(query, page, per_page):
+    match = build_match_query(query)
+    if search_available() and match:
+        return SearchPagination(page=page, per_page=per_page, error_out=False, match=match)
+
+    # Fallback tanpa FTS (mis. backend non-SQLite atau index belum dibuat)
+    return paginate_cards(card_query().filter(
+        Story.content.ilike(f'%{query}%')
+    ).order_by(Story.created_at.desc()), page, per_page)
@@ -157,24 +157,8 @@ function likeStory(storyId, button) {
             button.classList.remove('liked');
         }
 
-        // Update like counts in all relevant places
-        const story = document.getElementById(`story-${storyId}`);
-        if (story) {
-            // Update in story detail view
-            const stats = story.querySelector('.interaction-stats');
-            if (stats) {
-                const likeStats = stats.querySelector('.stat-item');
-                if (likeStats) {
-                    likeStats.innerHTML = `<i class="fas fa-heart"></i> ${data.like_count}`;
-                }
-            }
-
-            // Update in grid/list view
-            const likeCount = button.querySelector('.like-count');
-            if (likeCount) {
-                likeCount.textContent = data.like_count;
-            }
-        }
+        // Update like counts in all relevant places (card, detail, latest + popular)
+        updateStoryCounts({ story_id: storyId, like_count: data.like_count });
     })
     .catch(error => {
         console.error('Error:', error);
@@ -213,7 +197,7 @@ function likeComment(commentId, button) {
             button.querySelector('.fa-heart').classList.remove('fas');
             button.querySelector('.fa-heart').classList.add('far');
         }
-        button.querySelector('.like-count').textContent = data.like_count;
+        updateCommentCounts({ comment_id: commentId, like_count: data.like_count });
     })
     .catch(error => {
         console.error('Error:', error);
@@ -276,6 +260,112 @@ if (searchInput && !searchInput.value) {
 }
 });
 
+// Badge notifikasi (polling endpoint ringan hanya fallback jika browser tanpa EventSource)
+const NOTIFICATION_POLL_INTERVAL = 30000;
+
+function updateNotificationBadge(count) {
+    const dropdownButton = document.querySelector('.nav-dropdown-btn');
+    const notificationLink = document.querySelector('.dropdown-link[href="/notifications"]');
+    if (!dropdownButton || !notificationLink) return;
+
+    dropdownButton.classList.toggle('has-notifications', count > 0);
+    let badge = notificationLink.querySelector('.notification-badge');
+    if (count > 0) {
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'notification-badge';
+            notificationLink.appendChild(badge);
+        }
+        badge.textContent = count;
+    } else if (badge) {
+        badge.remove();
+    }
+}
+
+function updateStoryCounts(data) {
+    // Story yang sama bisa tampil dua kali (latest dan popular)
+    document.querySelectorAll(`[id="story-${data.story_id}"]`).forEach(story => {
+        if (data.like_count !== undefined) {
+            story.querySelectorAll('.like-count').forEach(el => { el.textContent = data.like_count; });
+        }
+        if (data.comment_count !== undefined) {
+            story.querySelectorAll('.comment-count').forEach(el => { el.textContent = data.comment_count; });
+        }
+    });
+}
+
+function updateCommentCounts(data) {
+    const comment = document.getElementById(`comment-${data.comment_id}`);
+    const likeCount = comment ? comment.querySelector('.comment-actions .like-count') : null;
+    if (likeCount) {
+        likeCount.textContent = data.like_count;
+    }
+}
+
+function pollNotifications() {
+    fetch('/notifications/unread_count', { credentials: 'same-origin' })
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (data) {
+                updateNotificationBadge(data.unread_count);
+            }
+        })
+        .catch(error => console.error('Error polling notifications:', error));
+}
+
+// Push real-time (SSE /stream): badge notifikasi dan counter story di halaman tanpa reload
+const LIVE_MAX_STORIES = 100;
+let liveStream = null;
+let notificationPoll = null;
+
+function startNotificationPolling(isAuthenticated) {
+    if (isAuthenticated && !notificationPoll) {
+        notificationPoll = setInterval(pollNotifications, NOTIFICATION_POLL_INTERVAL);
+    }
+}
+
+function connectLiveStream() {
+    const isAuthenticated = document.body.dataset.authenticated === 'true';
+    if (!window.EventSource) {
+        // Browser lama: kembali ke polling badge
+        startNotificationPolling(isAuthenticated);
+        return;
+    }
+
+    // Pengunjung anonim hanya mengikuti story di halaman detail (server menolak daftar story)
+    const selector = isAuthenticated ? '[id^="story-"]' : '.story-detail-card[id^="story-"]';
+    const storyIds = new Set();
+    document.querySelectorAll(selector).forEach(el => {
+        const match = el.id.match(/^story-(\d+)$/);
+        if (match) storyIds.add(match[1]);
+    });
+    if (!isAuthenticated && storyIds.size === 0) return;
+
+    // Yang terakhir dimuat (infinite scroll) paling mungkin sedang dilihat
+    const params = new URLSearchParams({ stories: Array.from(storyIds).slice(-LIVE_MAX_STORIES).join(',') });
+    if (liveStream) liveStream.close();
+    const stream = new EventSource(`/stream?${params}`);
+    liveStream = stream;
+    stream.addEventListener('open', () => {
+        clearInterval(notificationPoll);
+        notificationPoll = null;
+    });
+    stream.addEventListener('notification', event => {
+        updateNotificationBadge(JSON.parse(event.data).unread_count);
+    });
+    stream.addEventListener('counts', event => updateStoryCounts(JSON.parse(event.data)));
+    stream.addEventListener('comment_counts', event => updateCommentCounts(JSON.parse(event.data)));
+    stream.addEventListener('error', () => {
+        // Ditolak server (503 saat koneksi penuh): EventSource berhenti, badge kembali ke polling
+        if (stream.readyState === EventSource.CLOSED && liveStream === stream) {
+            liveStream = null;
+            startNotificationPolling(isAuthenticated);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', connectLiveStream);
+
 // Utility function to show flash messages
 function showFlashMessage(message, type = 'info') {
     let flashContainer = document.querySelector('.flash-messages');
@@ -305,16 +395,6 @@ function showFlashMessage(message, type = 'info') {
     }, 5000);
 }
 
-// Di script.js
-let page = 1;
-let loading = false;
-
-window.addEventListener('scroll', function() {
-    if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 500 && !loading) {
-        loadMoreStories();
-    }
-});
-
 // Smooth scroll to top when paginating
 function scrollToTop() {
     window.scrollTo({
@@ -324,8 +404,9 @@ function scrollToTop() {
 }
 
 // Add scroll to top for pagination links
+// (tombol "Muat lebih banyak" menambah cerita di tempat, jadi tidak ikut scroll ke atas)
 document.addEventListener('DOMContentLoaded', function() {
-    const paginationLinks = document.querySelectorAll('.pagination-btn:not(.disabled), .pagination-page:not(.active)');
+    const paginationLinks = document.querySelectorAll('.pagination-btn:not(.disabled):not(.load-more-btn), .pagination-page:not(.active)');
     
     paginationLinks.forEach(link => {
         link.addEventListener('click', function(e) {
@@ -380,144 +461,163 @@ document.addEventListener('DOMContentLoaded', function() {
     // ... existing code ...
 });
 
-// // Infinite Scroll Functionality
-// let currentPage = 1;
-// let isLoading = false;
-// let currentCategory = 'latest';
+// Infinite Scroll Functionality (cursor-based)
+// Setiap kategori menyimpan next_cursor di tombol .load-more-btn; halaman berikutnya
+// diambil dari /api/v2/stories?cursor=... sehingga scroll sedalam apapun tetap murah.
+let isLoading = false;
+
+function initInfiniteScroll() {
+    window.addEventListener('scroll', function() {
+        if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 500) {
+            const activeCategory = document.querySelector('.stories-category.active');
+            if (activeCategory) {
+                loadMoreStories(activeCategory);
+            }
+        }
+    });
+
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.load-more-btn');
+        if (button) {
+            e.preventDefault();
+            loadMoreStories(button.closest('.stories-category'));
+        }
+    });
+}
 
-// function initInfiniteScroll() {
-//     window.addEventListener('scroll', function() {
-//         if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 1000 && !isLoading) {
-//             loadMoreStories();
-//         }
-//     });
-// }
+async function loadMoreStories(container) {
+    const button = container ? container.querySelector('.load-more-btn') : null;
+    if (isLoading || !button || !button.dataset.nextCursor) return;
 
-async function loadMoreStories() {
-    if (isLoading) return;
-    
     isLoading = true;
-    currentPage++;
-    
+    const grid = container.querySelector('.stories-grid');
+    const category = button.dataset.category;
+
     // Show loading indicator
     const loadingIndicator = document.createElement('div');
     loadingIndicator.className = 'loading-indicator';
     loadingIndicator.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Memuat cerita lainnya...';
-    document.querySelector('.stories-container-grid').appendChild(loadingIndicator);
-    
+    grid.after(loadingIndicator);
+
     try {
-        const response = await fetch(`/api/stories?page=${currentPage}&category=${currentCategory}`);
+        const params = new URLSearchParams({ category: category, cursor: button.dataset.nextCursor });
+        const response = await fetch(`/api/v2/stories?${params}`, { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
+        }
         const data = await response.json();
-        
-        if (data.stories && data.stories.length > 0) {
-            // Remove loading indicator
-            loadingIndicator.remove();
-            
-            // Append new stories
-            data.stories.forEach(story => {
-                const storyElement = createStoryElement(story);
-                document.querySelector('.stories-container-grid').appendChild(storyElement);
-            });
-            
-            // Update state
-            if (!data.has_next) {
-                // Remove scroll listener if no more stories
-                window.removeEventListener('scroll', loadMoreStories);
-                
-                // Show end message
-                const endMessage = document.createElement('div');
-                endMessage.className = 'end-message';
-                endMessage.innerHTML = '<p>🎉 Anda telah melihat semua cerita!</p>';
-                document.querySelector('.stories-container-grid').appendChild(endMessage);
+
+        (data.stories || []).forEach(story => {
+            grid.appendChild(createStoryElement(story));
+        });
+        // Ikuti juga counter story yang baru dimuat
+        connectLiveStream();
+
+        if (data.next_cursor) {
+            button.dataset.nextCursor = data.next_cursor;
+            if (category === 'latest') {
+                button.href = `/?cursor=${encodeURIComponent(data.next_cursor)}`;
             }
         } else {
-            loadingIndicator.remove();
+            // Tidak ada halaman lagi
+            const endMessage = document.createElement('div');
+            endMessage.className = 'end-message';
+            endMessage.innerHTML = '<p>🎉 Anda telah melihat semua cerita!</p>';
+            button.remove();
+            grid.after(endMessage);
         }
     } catch (error) {
         console.error('Error loading more stories:', error);
+    } finally {
         loadingIndicator.remove();
+        isLoading = false;
     }
-    
-    isLoading = false;
+}
+
+const MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+
+function formatStoryTime(isoTime) {
+    // '2025-01-31T14:05:00' -> '31 Jan 2025 14:05', jam server seperti di halaman HTML
+    const [date, time] = isoTime.split('T');
+    const [year, month, day] = date.split('-');
+    return `${day} ${MONTH_NAMES[Number(month) - 1]} ${year} ${time.slice(0, 5)}`;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
 }
 
 function createStoryElement(story) {
+    const isAuthenticated = document.body.dataset.authenticated === 'true';
     const storyDiv = document.createElement('div');
-    storyDiv.className = 'story-card';
+    storyDiv.className = story.image_url ? 'story-card' : 'story-card no-image';
     storyDiv.id = `story-${story.id}`;
-    
-    // ✅ PERBAIKI: Handle image URL dengan benar
-    const imageHtml = story.image_url ? 
-        `<div class="story-image">
+    storyDiv.style.cursor = 'pointer';
+    storyDiv.addEventListener('click', () => {
+        window.location.href = `/story/${story.id}`;
+    });
+
+    const imageHtml = story.image_url ?
+        `<div class="story-image-side" style="cursor: zoom-in;">
             <img src="${story.image_url}" alt="Story image" loading="lazy" onerror="this.style.display='none'">
+            <div class="image-overlay">
+                <i class="fas fa-expand"></i>
+            </div>
         </div>` : '';
-    
-    const deleteHtml = story.can_delete ? 
-        `<form action="/delete_story/${story.id}" method="POST" class="delete-form">
+
+    const deleteHtml = story.can_delete ?
+        `<form action="/delete_story/${story.id}" method="POST" class="delete-form" onclick="event.stopPropagation()">
             <button type="submit" class="btn-delete" onclick="return confirm('Hapus curhatan ini?')">
                 <i class="fas fa-trash"></i>
             </button>
         </form>` : '';
-    
-    const likeButtonHtml = currentUserIsAuthenticated ? 
-        `<button class="btn-like ${story.user_has_liked ? 'liked' : ''}" 
-                onclick="likeStory(${story.id}, this)">
+
+    const likeButtonHtml = isAuthenticated ?
+        `<button class="btn-like ${story.user_has_liked ? 'liked' : ''}" data-story-id="${story.id}"
+                onclick="event.stopPropagation(); likeStory(${story.id}, this)">
             <i class="fas fa-heart"></i>
             <span class="like-count">${story.like_count}</span>
         </button>` :
-        `<button class="btn-like" onclick="window.location.href='/login'">
+        `<button class="btn-like" onclick="event.stopPropagation(); window.location.href='/login'">
             <i class="fas fa-heart"></i>
             <span class="like-count">${story.like_count}</span>
         </button>`;
-    
+
     storyDiv.innerHTML = `
         <div class="story-header">
             <div class="story-author">
-                <span class="author-name">${story.author_name}</span>
-                <span class="story-time">${story.created_at}</span>
+                <span class="author-name">${escapeHtml(story.author_name)}</span>
+                <span class="story-time">${formatStoryTime(story.created_at)}</span>
             </div>
             ${deleteHtml}
         </div>
-        
-        ${imageHtml}
-        
-        <div class="story-content">
-            ${story.content}
-        </div>
-        
-        <div class="story-actions">
-            <div class="action-group">
-                ${likeButtonHtml}
-                <a href="/story/${story.id}" class="btn-comment">
+
+        <div class="story-content-side">
+            ${imageHtml}
+
+            <div class="story-text">
+                ${escapeHtml(story.content)}
+            </div>
+
+            <div class="story-actions-side">
+                <div class="action-item">
+                    ${likeButtonHtml}
+                </div>
+                <a href="/story/${story.id}" class="action-item" onclick="event.stopPropagation()">
                     <i class="fas fa-comment"></i>
                     <span class="comment-count">${story.comment_count}</span>
                 </a>
             </div>
         </div>
     `;
-    
+
     return storyDiv;
 }
 
-// Update category tab switching
 document.addEventListener('DOMContentLoaded', function() {
     initInfiniteScroll();
-    initImageModal();
-    
-    const categoryTabs = document.querySelectorAll('.category-tab');
-    categoryTabs.forEach(tab => {
-        tab.addEventListener('click', function() {
-            const category = this.dataset.category;
-            currentCategory = category;
-            currentPage = 1;
-            
-            // Clear existing stories
-            document.querySelector('.stories-container-grid').innerHTML = '';
-            
-            // Load first page of new category
-            loadMoreStories();
-        });
-    });
 });
 
 // SIMPLE BUT WORKING MODAL SYSTEM
@@ -535,8 +635,10 @@ function initImageModal() {
             
             const img = e.target.closest('.story-image-side').querySelector('img');
             if (img && img.src) {
-                console.log('📸 Opening modal for:', img.src);
-                openImageModal(img.src);
+                // Pakai variant ukuran penuh jika ada (srcset kartu hanya versi kecil)
+                const fullSrc = img.dataset.fullSrc || img.currentSrc || img.src;
+                console.log('📸 Opening modal for:', fullSrc);
+                openImageModal(fullSrc);
             }
             return;
         }
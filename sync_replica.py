@@ -0,0 +1,22 @@
+import sqlite3
+from app import app
+from models import db
+from database import REPLICA_BIND
+
+# Pengganti replikasi untuk uji lokal dengan dua file SQLite:
+#   DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URL=sqlite:///replica.db
+with app.app_context():
+    primary = db.engines[None]
+    replica = db.engines.get(REPLICA_BIND)
+    if replica is None:
+        print("❌ DATABASE_REPLICA_URL belum diset")
+    elif primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        print("❌ Sinkronisasi manual hanya untuk SQLite; gunakan replikasi bawaan database server")
+    else:
+        source = sqlite3.connect(primary.url.database)
+        target = sqlite3.connect(replica.url.database)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+        print(f"✅ Replica {replica.url.database} sudah disalin dari primary!")
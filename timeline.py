@@ -0,0 +1,120 @@
+from datetime import timedelta
+import numpy as np
+from flask import current_app
+from models import db, Story, Comment, StoryLike, CommentLike, UserTimeline
+from config import get_indonesia_time
+
+# Job batch feed "Untukmu" (dijalankan build_timelines.py, bukan saat request).
+#
+# Kandidat = story terbaru (FOR_YOU_CANDIDATE_DAYS) dengan interaksi terbanyak.
+# Interaksi user ke kandidat (like story, komentar, like komentar; bobot
+# FOR_YOU_WEIGHTS) membentuk matriks R user x story. Kemiripan antar story =
+# cosine dari co-like (R^T R): story yang disukai/dikomentari orang yang sama.
+# Skor user = R_user . Sim, dikali peluruhan umur story; story yang sudah
+# disentuh atau ditulis user sendiri dibuang, lalu FOR_YOU_TIMELINE_SIZE
+# teratas ditulis ke user_timeline. Semua dihitung per batch user dengan
+# operasi matriks NumPy (float32), bukan loop per pasangan user-story.
+
+def load_candidates(now, config):
+    since = now - timedelta(days=config['FOR_YOU_CANDIDATE_DAYS'])
+    rows = db.session.query(Story.id, Story.user_id, Story.created_at).filter(
+        Story.created_at >= since
+    ).order_by((Story.like_count + Story.comment_count).desc(), Story.id.desc()).limit(
+        config['FOR_YOU_CANDIDATES']).all()
+    rows.sort(key=lambda row: row.id)
+    story_ids = np.array([row.id for row in rows], dtype=np.int64)
+    authors = np.array([row.user_id for row in rows], dtype=np.int64)
+    naive_now = now.replace(tzinfo=None)
+    age_hours = np.array([
+        (naive_now - row.created_at.replace(tzinfo=None)).total_seconds() / 3600 for row in rows
+    ], dtype=np.float32)
+    freshness = np.power(0.5, np.maximum(age_hours, 0) / config['FOR_YOU_HALF_LIFE_HOURS']).astype(np.float32)
+    return story_ids, authors, freshness
+
+def load_interactions(story_ids, weights):
+    # (user_id, story_id, bobot) untuk semua interaksi pada kandidat
+    candidates = story_ids.tolist()
+    sources = [
+        (db.session.query(StoryLike.user_id, StoryLike.story_id).filter(
+            StoryLike.story_id.in_(candidates)), weights['story_like']),
+        (db.session.query(Comment.user_id, Comment.story_id).filter(
+            Comment.story_id.in_(candidates)), weights['comment']),
+        (db.session.query(CommentLike.user_id, Comment.story_id).join(
+            Comment, Comment.id == CommentLike.comment_id).filter(
+            Comment.story_id.in_(candidates)), weights['comment_like']),
+    ]
+    users, stories, values = [], [], []
+    for query, weight in sources:
+        rows = np.array(query.all(), dtype=np.int64).reshape(-1, 2)
+        users.append(rows[:, 0])
+        stories.append(rows[:, 1])
+        values.append(np.full(len(rows), weight, dtype=np.float32))
+    return np.concatenate(users), np.concatenate(stories), np.concatenate(values)
+
+def _dense_batch(user_index, item_index, values, start, stop, item_count):
+    # Baris [start, stop) dari R sebagai matriks padat; interaksi berulang dijumlah lalu diredam log
+    batch = np.zeros((stop - start, item_count), dtype=np.float32)
+    np.add.at(batch, (user_index - start, item_index), values)
+    return np.log1p(batch)
+
+def build_timelines():
+    config = current_app.config
+    now = get_indonesia_time()
+    story_ids, authors, freshness = load_candidates(now, config)
+    if not len(story_ids):
+        return 0, 0
+    user_ids_raw, interaction_stories, values = load_interactions(story_ids, config['FOR_YOU_WEIGHTS'])
+
+    user_ids, user_index = np.unique(user_ids_raw, return_inverse=True)
+    item_index = np.searchsorted(story_ids, interaction_stories)
+    order = np.argsort(user_index, kind='stable')
+    user_index, item_index, values = user_index[order], item_index[order], values[order]
+    item_count = len(story_ids)
+    batch_size = config['FOR_YOU_USER_BATCH']
+    batches = [(start, min(start + batch_size, len(user_ids))) for start in range(0, len(user_ids), batch_size)]
+    bounds = {batch: np.searchsorted(user_index, batch) for batch in batches}
+
+    # Pass 1: co-occurrence antar story, C = R^T R, diakumulasi per batch user
+    co_occurrence = np.zeros((item_count, item_count), dtype=np.float32)
+    for start, stop in batches:
+        low, high = bounds[(start, stop)]
+        batch = _dense_batch(user_index[low:high], item_index[low:high], values[low:high], start, stop, item_count)
+        co_occurrence += batch.T @ batch
+
+    norms = np.sqrt(np.diag(co_occurrence))
+    norms[norms == 0] = 1
+    similarity = co_occurrence / norms[:, None] / norms[None, :]
+    np.fill_diagonal(similarity, 0)
+    del co_occurrence
+
+    # Pass 2: skor kandidat per user, ambil teratas, tulis ulang timeline batch ini
+    size = min(config['FOR_YOU_TIMELINE_SIZE'], item_count)
+    written = 0
+    for start, stop in batches:
+        low, high = bounds[(start, stop)]
+        batch = _dense_batch(user_index[low:high], item_index[low:high], values[low:high], start, stop, item_count)
+        scores = (batch @ similarity) * freshness
+        batch_users = user_ids[start:stop]
+        scores[batch > 0] = 0
+        scores[authors[None, :] == batch_users[:, None]] = 0
+
+        top = np.argpartition(-scores, size - 1, axis=1)[:, :size]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        # Tanpa sinyal co-like (skor 0) tidak ikut ditulis
+        kept_rows, kept_positions = np.nonzero(top_scores > 0)
+        rows = [{
+            'user_id': int(batch_users[row]),
+            'story_id': int(story_ids[top[row, position]]),
+            'score': float(top_scores[row, position]),
+            'generated_at': now,
+        } for row, position in zip(kept_rows.tolist(), kept_positions.tolist())]
+        db.session.execute(db.delete(UserTimeline).where(UserTimeline.user_id.in_(batch_users.tolist())))
+        if rows:
+            db.session.execute(db.insert(UserTimeline.__table__), rows)
+        db.session.commit()
+        written += len(rows)
+
+    # Timeline user yang tidak lagi punya interaksi di kandidat ikut dibuang
+    db.session.execute(db.delete(UserTimeline).where(UserTimeline.generated_at < now))
+    db.session.commit()
+    return len(user_ids), written